@@ -0,0 +1,48 @@
+"""Add booking_rooms with stay range and GiST index
+
+Revision ID: 7c2e9a4d1b38
+Revises: 4891e701c341
+Create Date: 2026-10-17 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9a4d1b38'
+down_revision: Union[str, None] = '4891e701c341'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # btree_gist lets the GiST index cover the uuid room_id next to the range
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    op.create_table('booking_rooms',
+    sa.Column('booking_id', sa.UUID(), nullable=False),
+    sa.Column('room_id', sa.UUID(), nullable=False),
+    sa.Column('stay', postgresql.DATERANGE(), nullable=False),
+    sa.ForeignKeyConstraint(['booking_id'], ['hotelassistant.bookings.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['room_id'], ['hotelassistant.rooms.id'], ),
+    sa.PrimaryKeyConstraint('booking_id', 'room_id'),
+    schema='hotelassistant'
+    )
+    op.create_index('ix_booking_rooms_room_id_stay', 'booking_rooms', ['room_id', 'stay'], unique=False, schema='hotelassistant', postgresql_using='gist')
+
+    # Backfill from the rooms array. Only active bookings get rows, so an
+    # overlap on booking_rooms is exactly "this room is taken".
+    op.execute("""
+        INSERT INTO hotelassistant.booking_rooms (booking_id, room_id, stay)
+        SELECT DISTINCT b.id, r.room_id, daterange(b.check_in, b.check_out, '[)')
+        FROM hotelassistant.bookings b
+        CROSS JOIN LATERAL unnest(b.rooms) AS r(room_id)
+        WHERE b.status IS DISTINCT FROM 'Cancelled'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_booking_rooms_room_id_stay', table_name='booking_rooms', schema='hotelassistant', postgresql_using='gist')
+    op.drop_table('booking_rooms', schema='hotelassistant')
@@ -0,0 +1,49 @@
+"""Recount conversation previews without tool result rows
+
+Revision ID: a9c41e6d2f70
+Revises: e7b2c94a1f53
+Create Date: 2026-10-17 18:40:12.904115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9c41e6d2f70'
+down_revision: Union[str, None] = 'e7b2c94a1f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def backfill(senders: str) -> None:
+    op.execute(f"""
+        UPDATE hotelassistant.conversations c
+        SET last_message = latest.message,
+            last_message_at = latest.created_at,
+            message_count = counts.message_count
+        FROM hotelassistant.conversations c2
+        LEFT JOIN LATERAL (
+            SELECT m.message, m.created_at
+            FROM hotelassistant.messages m
+            WHERE m.conversation_id = c2.id AND m.sender IN ({senders})
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT 1
+        ) latest ON true
+        CROSS JOIN LATERAL (
+            SELECT count(*) AS message_count
+            FROM hotelassistant.messages m
+            WHERE m.conversation_id = c2.id AND m.sender IN ({senders})
+        ) counts
+        WHERE c.id = c2.id
+    """)
+
+
+def upgrade() -> None:
+    backfill("'User', 'AI'")
+
+
+def downgrade() -> None:
+    backfill("'User', 'AI', 'Tool'")
@@ -0,0 +1,34 @@
+"""Add no-overlap exclusion constraint to booking_rooms
+
+Revision ID: b51f0e6c2a97
+Revises: 7c2e9a4d1b38
+Create Date: 2026-10-17 11:40:03.552917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b51f0e6c2a97'
+down_revision: Union[str, None] = '7c2e9a4d1b38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fails if the data already contains a double booking; those have to be
+    # resolved by hand before upgrading.
+    op.execute(
+        'ALTER TABLE hotelassistant.booking_rooms '
+        'ADD CONSTRAINT booking_rooms_no_overlap EXCLUDE USING gist (room_id WITH =, stay WITH &&)'
+    )
+    # The constraint's own GiST index on (room_id, stay) replaces this one
+    op.drop_index('ix_booking_rooms_room_id_stay', table_name='booking_rooms', schema='hotelassistant', postgresql_using='gist')
+
+
+def downgrade() -> None:
+    op.create_index('ix_booking_rooms_room_id_stay', 'booking_rooms', ['room_id', 'stay'], unique=False, schema='hotelassistant', postgresql_using='gist')
+    op.drop_constraint('booking_rooms_no_overlap', 'booking_rooms', schema='hotelassistant')
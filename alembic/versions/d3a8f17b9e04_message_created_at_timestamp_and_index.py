@@ -0,0 +1,41 @@
+"""Make messages.created_at a timestamp and index it per conversation
+
+Revision ID: d3a8f17b9e04
+Revises: b51f0e6c2a97
+Create Date: 2026-10-17 14:05:27.904116
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f17b9e04'
+down_revision: Union[str, None] = 'b51f0e6c2a97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows only carry a day; they become midnight of that day
+    op.alter_column('messages', 'created_at',
+               existing_type=sa.Date(),
+               type_=sa.DateTime(timezone=True),
+               existing_nullable=False,
+               postgresql_using='created_at::timestamptz',
+               server_default=sa.text('clock_timestamp()'),
+               schema='hotelassistant')
+    op.create_index('ix_messages_conversation_id_created_at', 'messages', ['conversation_id', 'created_at'], unique=False, schema='hotelassistant')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_messages_conversation_id_created_at', table_name='messages', schema='hotelassistant')
+    op.alter_column('messages', 'created_at',
+               existing_type=sa.DateTime(timezone=True),
+               type_=sa.Date(),
+               existing_nullable=False,
+               postgresql_using='created_at::date',
+               server_default=None,
+               schema='hotelassistant')
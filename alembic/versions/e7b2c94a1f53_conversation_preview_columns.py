@@ -0,0 +1,52 @@
+"""Add cached latest-message preview columns to conversations
+
+Revision ID: e7b2c94a1f53
+Revises: d3a8f17b9e04
+Create Date: 2026-10-17 15:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b2c94a1f53'
+down_revision: Union[str, None] = 'd3a8f17b9e04'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('conversations', sa.Column('last_message', sa.String(), nullable=True), schema='hotelassistant')
+    op.add_column('conversations', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True), schema='hotelassistant')
+    op.add_column('conversations', sa.Column('message_count', sa.Integer(), nullable=False, server_default='0'), schema='hotelassistant')
+    op.create_index(op.f('ix_hotelassistant_conversations_user_id'), 'conversations', ['user_id'], unique=False, schema='hotelassistant')
+    op.execute("""
+        UPDATE hotelassistant.conversations c
+        SET last_message = latest.message,
+            last_message_at = latest.created_at,
+            message_count = counts.message_count
+        FROM hotelassistant.conversations c2
+        CROSS JOIN LATERAL (
+            SELECT m.message, m.created_at
+            FROM hotelassistant.messages m
+            WHERE m.conversation_id = c2.id
+            ORDER BY m.created_at DESC, m.id DESC
+            LIMIT 1
+        ) latest
+        CROSS JOIN LATERAL (
+            SELECT count(*) AS message_count
+            FROM hotelassistant.messages m
+            WHERE m.conversation_id = c2.id
+        ) counts
+        WHERE c.id = c2.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_hotelassistant_conversations_user_id'), table_name='conversations', schema='hotelassistant')
+    op.drop_column('conversations', 'message_count', schema='hotelassistant')
+    op.drop_column('conversations', 'last_message_at', schema='hotelassistant')
+    op.drop_column('conversations', 'last_message', schema='hotelassistant')
@@ -0,0 +1,88 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from app.config.config import settings
+from app.db.session import SessionLocal
+from app.tools.tools import TOOLS
+from langchain_openai import ChatOpenAI
+import asyncio
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bounded pool for everything that still blocks: the SQLAlchemy tools, crud calls
+# and vector store writes. Keeping it bounded stops a burst of chats from opening
+# more DB connections than the pool can hand out.
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.TOOL_POOL_SIZE,
+    thread_name_prefix="agent-blocking",
+)
+
+# One model client per process. The httpx clients keep connections to the OpenAI API
+# alive between requests, and the tool schemas are bound once instead of per /chat.
+_http_limits = httpx.Limits(
+    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+    max_keepalive_connections=settings.OPENAI_MAX_CONNECTIONS,
+)
+http_client = httpx.Client(limits=_http_limits, timeout=60.0)
+http_async_client = httpx.AsyncClient(limits=_http_limits, timeout=60.0)
+
+llm = ChatOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    temperature=0.2,
+    model="gpt-4o-mini",
+    http_client=http_client,
+    http_async_client=http_async_client,
+)
+llm_with_tools = llm.bind_tools(list(TOOLS.values()))
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking callable on the bounded pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(func, *args, **kwargs))
+
+def invoke_tool(tool_instance, args):
+    """Invoke a tool with a fresh session injected. Meant to run inside the pool."""
+    tool_db = SessionLocal()
+    try:
+        return tool_instance.invoke({**args, "db_session": tool_db})
+    finally:
+        tool_db.close()
+
+# Tools that only read from the database. Any number of these can run at once;
+# everything else (bookings, updates, cancellations) is serialized.
+READ_ONLY_TOOLS = frozenset({
+    "getRoomTypes",
+    "getRooms",
+    "getAvailabilityCalendar",
+    "get_booking_history",
+})
+
+async def run_tool_calls(tool_calls, execute):
+    """
+    Execute the tool calls from one AIMessage and return their results in call order.
+
+    Runs of consecutive read-only calls are gathered concurrently, while a mutating
+    call waits for everything before it and finishes before anything after it starts.
+    """
+    results = []
+    batch = []
+
+    async def flush_batch():
+        if batch:
+            results.extend(await asyncio.gather(*[execute(call) for call in batch]))
+            batch.clear()
+
+    for call in tool_calls:
+        if call["name"] in READ_ONLY_TOOLS:
+            batch.append(call)
+        else:
+            await flush_batch()
+            results.append(await execute(call))
+    await flush_batch()
+    return results
+
+async def shutdown():
+    blocking_executor.shutdown(wait=False, cancel_futures=True)
+    http_client.close()
+    await http_async_client.aclose()
@@ -0,0 +1,183 @@
+from app.models.models import BookingRoom, RoomTypeEnum
+from app.catalog.catalog import catalog
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import Range
+from app.config.config import settings
+from datetime import date, timedelta
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ROOM_TYPES = [e.value for e in RoomTypeEnum]
+
+class AvailabilityIndex:
+    """
+    In-process bitmap of booked room-nights: one row per room, one column per
+    night from `start` over the next `horizon_days` nights.
+
+    The database stays the source of truth. The index is built from it at
+    startup, kept current by the booking tools, and rebuilt periodically by
+    refresh(), which also reports how far it had drifted. Bookings made by other
+    worker processes only show up here after the next refresh.
+
+    Its answers are therefore advisory. Free rooms are candidates that a booking
+    confirms against the database, and a count of zero is re-checked there before
+    a guest is told nothing is free. Other counts, such as calendar nights, may
+    be stale by up to one refresh interval.
+    """
+
+    def __init__(self, horizon_days: int):
+        self.horizon_days = horizon_days
+        self.start = None
+        self.room_ids = []
+        self.room_nos = np.zeros(0, dtype=np.int64)
+        self.room_types = np.zeros(0, dtype=np.int8)
+        self.booked = np.zeros((0, horizon_days), dtype=bool)
+        self._positions = {}
+        self._lock = threading.Lock()
+        # Changes made while a refresh is reading the database, replayed onto the
+        # freshly built bitmap so they aren't lost in the swap.
+        self._journal = None
+
+    @property
+    def ready(self) -> bool:
+        return self.start is not None
+
+    def _load(self, db, start: date):
+        end = start + timedelta(days=self.horizon_days)
+        rooms = [(room.id, room.room_no, room.type) for room in catalog.rooms().values()]
+        booked_stays = (
+            db.query(BookingRoom.room_id, func.lower(BookingRoom.stay), func.upper(BookingRoom.stay))
+            .filter(BookingRoom.stay.overlaps(Range(start, end, bounds="[)")))
+            .all()
+        )
+
+        positions = {room_id: i for i, (room_id, _, _) in enumerate(rooms)}
+        room_nos = np.array([room_no for _, room_no, _ in rooms], dtype=np.int64)
+        room_types = np.array([ROOM_TYPES.index(rt) for _, _, rt in rooms], dtype=np.int8)
+
+        rows, firsts, lasts = [], [], []
+        for room_id, check_in, check_out in booked_stays:
+            if room_id in positions:
+                rows.append(positions[room_id])
+                firsts.append(max((check_in - start).days, 0))
+                lasts.append(min((check_out - start).days, self.horizon_days))
+
+        # Mark every booked range at once with a difference array: +1 on the first
+        # night, -1 after the last, and a running sum along the nights.
+        diff = np.zeros((len(rooms), self.horizon_days + 1), dtype=np.int32)
+        np.add.at(diff, (np.array(rows, dtype=np.intp), np.array(firsts, dtype=np.intp)), 1)
+        np.add.at(diff, (np.array(rows, dtype=np.intp), np.array(lasts, dtype=np.intp)), -1)
+        booked = np.cumsum(diff, axis=1)[:, :self.horizon_days] > 0
+
+        return [room_id for room_id, _, _ in rooms], positions, room_nos, room_types, booked
+
+    def refresh(self, db, today: date = None) -> int:
+        """
+        Rebuild the bitmap from the database and swap it in.
+
+        Returns the number of room-nights that differed from the previous bitmap
+        (0 on the first build or when the window or room list changed).
+        """
+        start = today or date.today()
+        with self._lock:
+            self._journal = []
+        try:
+            room_ids, positions, room_nos, room_types, booked = self._load(db, start)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        with self._lock:
+            for booked_flag, room_list, check_in, check_out in self._journal:
+                self._mark(positions, booked, start, room_list, check_in, check_out, booked_flag)
+            self._journal = None
+
+            drift = 0
+            if self.start == start and self.room_ids == room_ids:
+                drift = int(np.count_nonzero(self.booked != booked))
+            self.start = start
+            self.room_ids = room_ids
+            self.room_nos = room_nos
+            self.room_types = room_types
+            self.booked = booked
+            self._positions = positions
+
+        if drift:
+            logger.warning(f"[Availability] Index drifted from the database by {drift} room-nights; rebuilt")
+        return drift
+
+    def _columns(self, start: date, check_in: date, check_out: date):
+        return (check_in - start).days, (check_out - start).days
+
+    def _mark(self, positions, booked, start, room_ids, check_in, check_out, booked_flag):
+        first, last = self._columns(start, check_in, check_out)
+        first, last = max(first, 0), min(last, self.horizon_days)
+        if first >= last:
+            return
+        rows = [positions[room_id] for room_id in room_ids if room_id in positions]
+        if rows:
+            booked[rows, first:last] = booked_flag
+
+    def covers(self, check_in: date, check_out: date) -> bool:
+        if not self.ready:
+            return False
+        first, last = self._columns(self.start, check_in, check_out)
+        return 0 <= first < last <= self.horizon_days
+
+    def _free_mask(self, check_in: date, check_out: date, room_type: str = None):
+        first, last = self._columns(self.start, check_in, check_out)
+        free = ~self.booked[:, first:last].any(axis=1)
+        if room_type is not None:
+            free &= self.room_types == ROOM_TYPES.index(room_type)
+        return free
+
+    def free_rooms(self, check_in: date, check_out: date, room_type: str = None):
+        """Ids of rooms free for the whole stay, lowest room number first."""
+        with self._lock:
+            free = self._free_mask(check_in, check_out, room_type)
+            return [self.room_ids[i] for i in np.flatnonzero(free)]
+
+    def count_free_by_type(self, check_in: date, check_out: date):
+        with self._lock:
+            free = self._free_mask(check_in, check_out)
+            counts = np.bincount(self.room_types[free], minlength=len(ROOM_TYPES))
+        return {room_type: int(count) for room_type, count in zip(ROOM_TYPES, counts)}
+
+    def free_counts_by_night(self, start: date, end: date):
+        """Free rooms per room type for each night in [start, end), as arrays per type."""
+        with self._lock:
+            first, last = self._columns(self.start, start, end)
+            free = ~self.booked[:, first:last]
+            return {
+                room_type: free[self.room_types == code].sum(axis=0)
+                for code, room_type in enumerate(ROOM_TYPES)
+            }
+
+    def book(self, room_ids, check_in: date, check_out: date):
+        self._apply(True, room_ids, check_in, check_out)
+
+    def release(self, room_ids, check_in: date, check_out: date):
+        self._apply(False, room_ids, check_in, check_out)
+
+    def _apply(self, booked_flag, room_ids, check_in, check_out):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((booked_flag, list(room_ids), check_in, check_out))
+            if self.ready:
+                self._mark(self._positions, self.booked, self.start, room_ids, check_in, check_out, booked_flag)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "start": self.start.isoformat() if self.start else None,
+                "rooms": len(self.room_ids),
+                "horizon_days": self.horizon_days,
+                "booked_room_nights": int(self.booked.sum()),
+            }
+
+availability_index = AvailabilityIndex(settings.AVAILABILITY_HORIZON_DAYS)
@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from app.models.models import Room, RoomType
+from app.db.session import SessionLocal
+from app.config.config import settings
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class RoomInfo:
+    id: object
+    room_no: int
+    room_type_id: object
+    type: str
+    cost: float
+
+@dataclass(frozen=True)
+class RoomTypeInfo:
+    id: object
+    type: str
+    description: str
+    capacity: int
+    cost: float
+
+class RoomCatalog:
+    """
+    In-process copy of the rooms and room_type tables.
+
+    Both change about once a year, so tools read them from here instead of
+    querying on every call. The copy is reloaded after ttl_seconds, or on the
+    next read after invalidate() is called. ORM writes to Room or RoomType in
+    this process invalidate it automatically.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._rooms = {}
+        self._room_types = []
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def load(self, db):
+        room_types = db.query(RoomType).all()
+        types_by_id = {rt.id: rt for rt in room_types}
+        rooms = db.query(Room).order_by(Room.room_no).all()
+        room_infos = {
+            room.id: RoomInfo(
+                id=room.id,
+                room_no=room.room_no,
+                room_type_id=room.room_type_id,
+                type=types_by_id[room.room_type_id].type.value,
+                cost=float(types_by_id[room.room_type_id].cost),
+            )
+            for room in rooms
+        }
+        type_infos = [
+            RoomTypeInfo(id=rt.id, type=rt.type.value, description=rt.description, capacity=rt.capacity, cost=float(rt.cost))
+            for rt in room_types
+        ]
+        # Swap both at once so readers never see rooms and types from different loads
+        self._rooms, self._room_types = room_infos, type_infos
+        self._loaded_at = time.monotonic()
+        logger.info(f"[Catalog] Loaded {len(room_infos)} rooms and {len(type_infos)} room types")
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _ensure_fresh(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+            return
+        with self._lock:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds:
+                return
+            db = SessionLocal()
+            try:
+                self.load(db)
+            finally:
+                db.close()
+
+    def rooms(self):
+        """room_id -> RoomInfo, ordered by room number."""
+        self._ensure_fresh()
+        return self._rooms
+
+    def room_types(self):
+        self._ensure_fresh()
+        return self._room_types
+
+    def room_type_ids(self, room_type: str):
+        return [rt.id for rt in self.room_types() if rt.type == room_type]
+
+    def stats(self):
+        return {
+            "rooms": len(self._rooms),
+            "room_types": len(self._room_types),
+            "age_seconds": time.monotonic() - self._loaded_at if self._loaded_at is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+catalog = RoomCatalog(settings.CATALOG_TTL_SECONDS)
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_catalog_on_write(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, (Room, RoomType)):
+            catalog.invalidate()
+            return
@@ -13,7 +13,41 @@ class Settings(BaseSettings):
     POSTGRES_URL: str
     OPENAI_API_KEY: str
     DEEPGRAM_API_KEY: str
+    DEEPGRAM_URL: str = "https://api.deepgram.com/v1/listen"
+    DEEPGRAM_LIVE_URL: str = "wss://api.deepgram.com/v1/listen"
     ELEVENLABS_API_KEY: str
+    TOOL_POOL_SIZE: int = 8
+    OPENAI_MAX_CONNECTIONS: int = 20
+    VECTORSTORE_MAX_OPEN: int = 64
+    EMBEDDING_BATCH_SIZE: int = 64
+    EMBEDDING_BATCH_WAIT_MS: int = 200
+    EMBEDDING_CACHE_PATH: str = "./embedding_cache/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 50000
+    AVAILABILITY_HORIZON_DAYS: int = 365
+    AVAILABILITY_RECONCILE_SECONDS: int = 300
+    CATALOG_TTL_SECONDS: int = 3600
+    HISTORY_WINDOW: int = 20
+    HISTORY_CACHE_CONVERSATIONS: int = 1000
+    CONVERSATION_PREVIEW_CACHE: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    TTS_MAX_CONNECTIONS: int = 10
+    TTS_TIMEOUT_SECONDS: float = 30.0
+    TTS_CACHE_DIR: str = "./tts_cache"
+    TTS_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+    TTS_SENTENCE_CONCURRENCY: int = 3
+    STT_MAX_CONNECTIONS: int = 10
+    STT_TIMEOUT_SECONDS: float = 60.0
+    VOICE_UPLOAD_MAX_BYTES: int = 25 * 1024 * 1024
+    VOICE_UPLOAD_SPOOL_BYTES: int = 256 * 1024
+    VAD_ENABLED: bool = True
+    VAD_THRESHOLD_DBFS: float = -45.0
+    VAD_NOISE_MARGIN_DB: float = 10.0
+    VAD_PADDING_MS: int = 250
+    VAD_MIN_SPEECH_MS: int = 150
     class Config:
         env_file = ".env"
 
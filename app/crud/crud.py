@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import tuple_, select, func, true, update, insert
 from typing import List, Optional
-from app.models.models import Conversation, Message, User
+from app.models.models import Conversation, Message, User, SenderEnum
 from app.schemas.schemas import MessageCreate, UserCreate, UserLogin
+from app.history.history import history_cache, HistoryEntry
 from uuid import uuid4
 import hashlib
 
@@ -31,15 +33,166 @@ def create_conversation(db: Session, user_id=None) -> Conversation:
     db.refresh(conv)
     return conv
 
-def create_message(db: Session, message: MessageCreate) -> Message:
-    mes = Message(**message.dict())
-    db.add(mes)
+# Senders of the conversation itself; Tool rows hold raw tool output for the record
+CONVERSATION_SENDERS = [SenderEnum.User, SenderEnum.AI]
+
+def update_conversation_preview(db: Session, conversation_id, last_message, last_message_at, added: int = 1):
+    """Bump the cached preview columns of a conversation in the caller's transaction."""
+    db.execute(update(Conversation)
+               .where(Conversation.id == conversation_id)
+               .values(last_message=last_message,
+                       last_message_at=last_message_at,
+                       message_count=Conversation.message_count + added))
+
+def create_messages(db: Session, messages: List[MessageCreate], created_at: Optional[List] = None) -> List[Message]:
+    """
+    Insert messages with one INSERT ... RETURNING and commit.
+
+    `created_at`, when given, holds one timestamp per message (they should increase,
+    so the messages keep their order); otherwise the database stamps them. The
+    returned messages are detached and fully loaded, so reading them after the
+    commit doesn't cost a refresh.
+    """
+    rows = [message.model_dump() for message in messages]
+    if created_at is not None:
+        for row, stamp in zip(rows, created_at):
+            row["created_at"] = stamp
+    saved = list(db.scalars(insert(Message).returning(Message, sort_by_parameter_order=True), rows))
+
+    latest = {}
+    for mes in saved:
+        if mes.sender not in CONVERSATION_SENDERS:
+            continue
+        count, _ = latest.get(mes.conversation_id, (0, None))
+        latest[mes.conversation_id] = (count + 1, mes)
+    for conversation_id, (count, mes) in latest.items():
+        update_conversation_preview(db, conversation_id, mes.message, mes.created_at, added=count)
+
+    for mes in saved:
+        db.expunge(mes)
     db.commit()
-    db.refresh(mes)
-    return mes
-
-def get_messages(db: Session, conversation_id: str) -> List[Message]:
-    return (db.query(Message)
-            .filter(Message.conversation_id == conversation_id)
-            .order_by(Message.created_at.asc())
-            .all())
\ No newline at end of file
+    for mes in saved:
+        if mes.sender != SenderEnum.Tool:
+            history_cache.append(mes.conversation_id, HistoryEntry(mes.id, mes.sender, mes.message, mes.created_at))
+    return saved
+
+def get_recent_messages(db: Session, conversation_id, limit: int, senders=None) -> List[Message]:
+    """The latest `limit` messages, oldest first, optionally only from `senders`."""
+    query = db.query(Message).filter(Message.conversation_id == conversation_id)
+    if senders is not None:
+        query = query.filter(Message.sender.in_(senders))
+    latest = (query
+              .order_by(Message.created_at.desc(), Message.id.desc())
+              .limit(limit)
+              .all())
+    return latest[::-1]
+
+def get_history(db: Session, conversation_id) -> List[HistoryEntry]:
+    """
+    Prompt history (user and AI messages) for a conversation, from the ring buffer
+    when it is cached and still matches the conversation's message_count.
+    """
+    # Read before the messages, as history_cache.load expects
+    message_count = db.query(Conversation.message_count).filter(Conversation.id == conversation_id).scalar() or 0
+    entries = history_cache.get(conversation_id, message_count)
+    if entries is None:
+        messages = get_recent_messages(db, conversation_id, history_cache.window, senders=CONVERSATION_SENDERS)
+        entries = [HistoryEntry(m.id, m.sender, m.message, m.created_at) for m in messages]
+        history_cache.load(conversation_id, entries, message_count)
+    return entries
+
+def _message_cursor(db: Session, conversation_id, message_id):
+    """(created_at, id) of a message used as a page cursor; ValueError if it isn't in the conversation."""
+    cursor = (db.query(Message.created_at, Message.id)
+              .filter(Message.id == message_id, Message.conversation_id == conversation_id)
+              .first())
+    if cursor is None:
+        raise ValueError(f"Message {message_id} not found in conversation {conversation_id}")
+    return tuple_(Message.created_at, Message.id), tuple(cursor)
+
+def get_messages_page(db: Session, conversation_id, limit: Optional[int] = None, before=None, after=None) -> List[Message]:
+    """
+    One page of user and AI messages, oldest first, using (created_at, id) as the keyset.
+
+    With `before`, the `limit` messages just older than that message; with `after`,
+    the ones just newer; with neither, the latest `limit` messages. Without
+    `limit`, every message on that side of the cursors.
+    """
+    query = db.query(Message).filter(Message.conversation_id == conversation_id,
+                                     Message.sender.in_(CONVERSATION_SENDERS))
+    if after is not None:
+        key, cursor = _message_cursor(db, conversation_id, after)
+        query = query.filter(key > cursor)
+    if before is not None:
+        key, cursor = _message_cursor(db, conversation_id, before)
+        query = query.filter(key < cursor)
+
+    if after is not None and before is None:
+        return (query.order_by(Message.created_at.asc(), Message.id.asc())
+                .limit(limit)
+                .all())
+    latest = (query.order_by(Message.created_at.desc(), Message.id.desc())
+              .limit(limit)
+              .all())
+    return latest[::-1]
+
+def iter_messages(db: Session, conversation_id, before=None, after=None, limit=None, batch_size: int = 500):
+    """
+    Stream a conversation's user and AI messages oldest first through a server-side
+    cursor, `batch_size` rows at a time, optionally bounded by the `after`/`before`
+    cursors and `limit`.
+    """
+    # A 2.0-style select: the legacy Query refuses yield_per for this entity
+    query = select(Message).where(Message.conversation_id == conversation_id,
+                                  Message.sender.in_(CONVERSATION_SENDERS))
+    if after is not None:
+        key, cursor = _message_cursor(db, conversation_id, after)
+        query = query.where(key > cursor)
+    if before is not None:
+        key, cursor = _message_cursor(db, conversation_id, before)
+        query = query.where(key < cursor)
+    query = query.order_by(Message.created_at.asc(), Message.id.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    yield from db.scalars(query.execution_options(yield_per=batch_size))
+
+def get_conversation_previews(db: Session, user_id, limit: int, offset: int = 0, cached: bool = False):
+    """
+    A user's conversations, most recently active first, each with its latest
+    user or AI message and the count of those, in one query.
+
+    With `cached`, the denormalized preview columns are read; otherwise the latest
+    message and the count come from LATERAL subqueries over the messages index.
+    """
+    if cached:
+        query = db.query(Conversation.id,
+                         Conversation.user_id,
+                         Conversation.last_message.label("latest_message"),
+                         Conversation.last_message_at.label("latest_message_at"),
+                         Conversation.message_count)
+        last_at = Conversation.last_message_at
+    else:
+        latest = (select(Message.message, Message.created_at)
+                  .where(Message.conversation_id == Conversation.id,
+                         Message.sender.in_(CONVERSATION_SENDERS))
+                  .order_by(Message.created_at.desc(), Message.id.desc())
+                  .limit(1)
+                  .lateral("latest"))
+        counts = (select(func.count().label("message_count"))
+                  .where(Message.conversation_id == Conversation.id,
+                         Message.sender.in_(CONVERSATION_SENDERS))
+                  .lateral("counts"))
+        query = (db.query(Conversation.id,
+                          Conversation.user_id,
+                          latest.c.message.label("latest_message"),
+                          latest.c.created_at.label("latest_message_at"),
+                          counts.c.message_count)
+                 .select_from(Conversation)
+                 .outerjoin(latest, true())
+                 .join(counts, true()))
+        last_at = latest.c.created_at
+    return (query.filter(Conversation.user_id == user_id)
+            .order_by(last_at.desc().nulls_last(), Conversation.id)
+            .offset(offset)
+            .limit(limit)
+            .all())
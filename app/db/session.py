@@ -1,20 +1,112 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from urllib.parse import quote_plus
 from dotenv import load_dotenv
+from app.config.config import settings
+import logging
 import os
+import ssl
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("POSTGRES_URL")
 
 if not DATABASE_URL:
     raise ValueError("POSTGRES_URL environment variable is not set")
-engine = create_engine(DATABASE_URL)
 
-# Set the search_path to hotelassistant schema
-with engine.connect() as connection:
-    connection.execute(text("SET search_path TO hotelassistant"))
-    connection.commit()
+SEARCH_PATH = "hotelassistant"
+
+POOL_OPTIONS = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
+
+# Set the search_path to hotelassistant schema on every new pooled connection
+@event.listens_for(engine, "connect", insert=True)
+def set_search_path(dbapi_connection, connection_record):
+    autocommit = dbapi_connection.autocommit
+    dbapi_connection.autocommit = True
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET SESSION search_path TO {SEARCH_PATH}")
+    cursor.close()
+    dbapi_connection.autocommit = autocommit
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# libpq options asyncpg has no keyword for; they're dropped from the async URL
+LIBPQ_ONLY_OPTIONS = ("keepalives", "keepalives_idle", "keepalives_interval", "keepalives_count",
+                      "gssencmode", "channel_binding", "options", "sslcompression", "sslcrl",
+                      "requirepeer", "krbsrvname", "service")
+
+def asyncpg_url_and_args(url: str):
+    """
+    The POSTGRES_URL rewritten for asyncpg, plus its connect_args.
+
+    Hosted Postgres URLs carry libpq query options (sslmode=require and friends)
+    that asyncpg.connect() rejects, so they are translated to its keywords:
+    sslmode and the certificate files become `ssl`, connect_timeout `timeout`,
+    application_name a server setting. Options with no equivalent are dropped.
+    """
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(url.query)
+    # asyncpg takes the search_path as a startup parameter, so it holds on every connection too
+    server_settings = {"search_path": SEARCH_PATH}
+    connect_args = {"server_settings": server_settings}
+
+    sslmode = query.pop("sslmode", None)
+    certs = {key: query.pop(key) for key in ("sslrootcert", "sslcert", "sslkey", "sslpassword") if key in query}
+    if certs and sslmode != "disable":
+        context = ssl.create_default_context(cafile=certs.get("sslrootcert"))
+        # As in libpq, only verify-full checks the host name, and without a root
+        # certificate the lower modes don't verify the server at all
+        context.check_hostname = sslmode == "verify-full"
+        if sslmode not in ("verify-ca", "verify-full") and "sslrootcert" not in certs:
+            context.verify_mode = ssl.CERT_NONE
+        if "sslcert" in certs:
+            context.load_cert_chain(certs["sslcert"], certs.get("sslkey"), certs.get("sslpassword"))
+        connect_args["ssl"] = context
+    elif sslmode is not None:
+        # asyncpg understands the libpq mode names themselves
+        connect_args["ssl"] = sslmode
+
+    if "connect_timeout" in query:
+        connect_args["timeout"] = float(query.pop("connect_timeout"))
+    if "application_name" in query:
+        server_settings["application_name"] = query.pop("application_name")
+    dropped = [key for key in LIBPQ_ONLY_OPTIONS if query.pop(key, None) is not None]
+    if dropped:
+        logger.warning(f"Ignoring libpq-only options for the async engine: {', '.join(dropped)}")
+    return url.set(query=query), connect_args
+
+ASYNC_DATABASE_URL, ASYNC_CONNECT_ARGS = asyncpg_url_and_args(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=ASYNC_CONNECT_ARGS,
+    **POOL_OPTIONS,
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def _pool_stats(pool):
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_connections": settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW,
+    }
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+def pool_stats():
+    return {
+        "sync": _pool_stats(engine.pool),
+        "async": _pool_stats(async_engine.sync_engine.pool),
+    }
@@ -0,0 +1,92 @@
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from app.config.config import settings
+import threading
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    id: object
+    sender: str
+    message: str
+    created_at: datetime
+
+class ConversationHistoryCache:
+    """
+    Ring buffer of the latest `window` messages for each active conversation.
+
+    crud.create_messages writes through to it, so building the prompt for the
+    next turn doesn't read the messages back from Postgres. At most
+    max_conversations buffers are kept; the least recently used is dropped first.
+
+    Each worker process has its own cache and sees only its own writes, so every
+    buffer remembers how many user and AI messages it accounts for. get() takes
+    Conversation.message_count from the database and treats a buffer that
+    disagrees as stale: a message was written by another worker, or it was
+    committed while the buffer was being loaded and its append() missed it.
+    """
+
+    def __init__(self, window: int, max_conversations: int):
+        self.window = window
+        self.max_conversations = max_conversations
+        # conversation_id -> (deque of entries, message count they reflect)
+        self._buffers = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def get(self, conversation_id, message_count: int):
+        """
+        The cached messages oldest first, or None if the conversation isn't cached
+        or its buffer doesn't reflect `message_count` messages (then it is dropped).
+        """
+        with self._lock:
+            cached = self._buffers.get(conversation_id)
+            if cached is not None and cached[1] != message_count:
+                del self._buffers[conversation_id]
+                self.stale += 1
+                cached = None
+            if cached is None:
+                self.misses += 1
+                return None
+            self._buffers.move_to_end(conversation_id)
+            self.hits += 1
+            return list(cached[0])
+
+    def load(self, conversation_id, entries, message_count: int):
+        """
+        Seed a conversation from the database (entries oldest first).
+
+        Read `message_count` before the entries: a message committed in between
+        then leaves the count behind the buffer, and the next get() reloads.
+        """
+        with self._lock:
+            self._buffers[conversation_id] = (deque(entries, maxlen=self.window), message_count)
+            self._buffers.move_to_end(conversation_id)
+            while len(self._buffers) > self.max_conversations:
+                self._buffers.popitem(last=False)
+
+    def append(self, conversation_id, entry):
+        """Record a new message; conversations that aren't cached are left to load()."""
+        with self._lock:
+            cached = self._buffers.get(conversation_id)
+            # A load that already read this message has it, but not in its count
+            if cached is not None and all(e.id != entry.id for e in cached[0]):
+                self._buffers[conversation_id] = (cached[0], cached[1] + 1)
+                cached[0].append(entry)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "conversations": len(self._buffers),
+                "max_conversations": self.max_conversations,
+                "window": self.window,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+history_cache = ConversationHistoryCache(settings.HISTORY_WINDOW, settings.HISTORY_CACHE_CONVERSATIONS)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Integer, Enum, ForeignKey, Date, Numeric, ARRAY
-from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from sqlalchemy import Column, String, Integer, Enum, ForeignKey, Date, DateTime, Numeric, ARRAY, Index
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, DATERANGE, ExcludeConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import MetaData
 import enum
@@ -34,17 +34,25 @@ class Conversation(Base):
     __tablename__ = 'conversations'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('hotelassistant.users.id'), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('hotelassistant.users.id'), nullable=False, index=True)
+    # Denormalized preview of the latest message, maintained by crud.create_messages
+    last_message = Column(String)
+    last_message_at = Column(DateTime(timezone=True))
+    message_count = Column(Integer, nullable=False, default=0, server_default='0')
 
 class Message(Base):
     __tablename__ = 'messages'
+    __table_args__ = (
+        Index('ix_messages_conversation_id_created_at', 'conversation_id', 'created_at'),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     conversation_id = Column(UUID(as_uuid=True), ForeignKey('hotelassistant.conversations.id'), nullable=False)
     message = Column(String)
     sender = Column(Enum(SenderEnum))
     toolsused = Column(ARRAY(String))
-    created_at = Column(Date, nullable=False, default=func.now())
+    # clock_timestamp() rather than now(), so messages written in one transaction still sort in order
+    created_at = Column(DateTime(timezone=True), nullable=False, default=func.clock_timestamp())
 
 class Booking(Base):
     __tablename__ = 'bookings'
@@ -56,6 +64,19 @@ class Booking(Base):
     check_out = Column(Date, nullable=False)
     status = Column(Enum(BookingStatus), default=BookingStatus.Booked)
 
+class BookingRoom(Base):
+    """One row per room of an active booking; `stay` is the [check_in, check_out) range.
+    The exclusion constraint makes overlapping stays of the same room impossible, and
+    its GiST index also serves the availability overlap queries."""
+    __tablename__ = 'booking_rooms'
+    __table_args__ = (
+        ExcludeConstraint(('room_id', '='), ('stay', '&&'), name='booking_rooms_no_overlap', using='gist'),
+    )
+
+    booking_id = Column(UUID(as_uuid=True), ForeignKey('hotelassistant.bookings.id', ondelete='CASCADE'), primary_key=True)
+    room_id = Column(UUID(as_uuid=True), ForeignKey('hotelassistant.rooms.id'), primary_key=True)
+    stay = Column(DATERANGE, nullable=False)
+
 class Room(Base):
     __tablename__ = 'rooms'
 
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field, EmailStr
 from typing import Optional, List
 from uuid import UUID
-from datetime import date
+from datetime import date, datetime
 from app.models.models import SenderEnum, BookingStatus, RoomTypeEnum
 
 class UserCreate(BaseModel):
@@ -28,7 +28,7 @@ class MessageResponse(BaseModel):
     message: str
     sender: SenderEnum
     toolsused: Optional[List[str]] = None
-    created_at: date
+    created_at: datetime
 
 class ConversationCreate(BaseModel):
     user_id: UUID
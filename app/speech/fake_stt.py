@@ -0,0 +1,64 @@
+"""
+A stand-in for Deepgram's live transcription WebSocket, for local runs and tests.
+
+The "audio" it receives is taken to be UTF-8 text, so a test can speak by sending
+b"I want to book a room." in as many chunks as it likes. Every chunk produces an
+interim result; a chunk ending in . ? or ! counts as the end of an utterance and
+produces a final, speech_final result. CloseStream flushes what is left and
+closes the session, like the real API.
+
+    python -m app.speech.fake_stt --port 8765
+    DEEPGRAM_LIVE_URL=ws://localhost:8765/v1/listen uvicorn main:app
+"""
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+import argparse
+import asyncio
+import json
+
+UTTERANCE_END = (".", "?", "!")
+
+def result(text, is_final, speech_final):
+    return json.dumps({
+        "type": "Results",
+        "channel": {"alternatives": [{"transcript": text, "confidence": 1.0}]},
+        "is_final": is_final,
+        "speech_final": speech_final,
+    })
+
+async def handle(ws):
+    heard = ""
+    try:
+        async for frame in ws:
+            if isinstance(frame, bytes):
+                heard += frame.decode("utf-8", errors="ignore")
+                text = " ".join(heard.split())
+                if text.endswith(UTTERANCE_END):
+                    await ws.send(result(text, True, True))
+                    heard = ""
+                elif text:
+                    await ws.send(result(text, False, False))
+                continue
+            message = json.loads(frame)
+            if message.get("type") == "CloseStream":
+                text = " ".join(heard.split())
+                if text:
+                    await ws.send(result(text, True, True))
+                await ws.close(1000)
+                return
+    except ConnectionClosed:
+        pass
+
+async def run(host: str, port: int):
+    async with serve(handle, host, port) as server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port))
+
+if __name__ == "__main__":
+    main()
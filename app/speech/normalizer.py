@@ -0,0 +1,167 @@
+import re
+
+# Every markdown construct the speech output cares about, matched in one pass.
+# A single space between plain words isn't a token, it stays part of the text;
+# only whitespace that may need collapsing or stripping is.
+# Line-anchored alternatives rely on MULTILINE `^`; scanning always starts at
+# pos >= 1 behind the previous character, so `^` only matches at real line starts.
+TOKEN = re.compile(r"""
+    # Cheap filter first: every token starts at a special character or a line start
+    (?=[`\[\s*_\#]|^)
+    (?:
+    (?P<fence>```)
+  | (?P<code>`)
+  | \[(?P<link>[^\]]+)\]\([^\)]+\)
+  | (?P<bracket>\[)
+  | (?P<rule>^[ \t]*[-*_]{3,}[ \t]*(?=\n|\Z))
+  | (?P<marker>^[ \t]*(?:[-*+]|\d+\.)[ \t]+)
+  | (?P<header>\#{1,6}[ \t]+)
+  | (?P<emphasis>\*+|_+)
+  | (?P<space>\s{2,}|[^\S\ ]|\ (?=[`*_\[\#]|\Z))
+    )
+""", re.MULTILINE | re.VERBOSE)
+
+# A "[" that may still become a link once more text arrives
+PARTIAL_LINK = re.compile(r"\[[^\]]*(?:\]|\]\([^\)]*)?\Z")
+MAX_LINK_CHARS = 500
+
+class SpeechNormalizer:
+    """
+    Strips markdown from model output for text-to-speech, incrementally.
+
+    feed() takes chunks as they stream in and returns the text that can already
+    be spoken; flush() returns the rest once the reply is complete. Only the
+    tail that is still ambiguous is held back: the last word, an open link, or
+    the inside of an unfinished code fence. Code blocks are dropped, inline
+    code, emphasis, headers, list markers and rules unwrapped, links reduced to
+    their text, and runs of whitespace collapsed to one space.
+
+    That is what the old regex cleaner did, except where emphasis markers don't
+    pair up or a fence isn't closed:
+    - A `*` or `_` run with letters or digits on both sides is kept: room_type_id
+      and a*b*c stay as they are, where the old cleaner paired the markers up
+      and said roomtypeid and abc.
+    - Any other `*` or `_` run touching a word is dropped even without a
+      partner, so *note and note* both become note. The old cleaner kept
+      unpaired markers. Runs with space on both sides are still kept.
+    - An unclosed ``` drops everything after it, because a stream can't wait to
+      see whether it closes. The old cleaner kept such text, backticks included.
+    """
+
+    def __init__(self):
+        # The buffer always starts with the last character already consumed, so
+        # emphasis flanking and `^` line starts carry across chunks.
+        self._buffer = "\n"
+        self._in_fence = False
+        self._pending_space = ""
+        # Length of _pending_space at the last horizontal rule
+        self._rule_mark = 0
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        self._buffer += text
+        out = []
+        self._drain(out, final=False)
+        return "".join(out)
+
+    def flush(self) -> str:
+        out = []
+        self._drain(out, final=True)
+        self._pending_space = ""
+        return "".join(out)
+
+    def _drain(self, out, final):
+        buffer = self._buffer
+        pos = 1
+        while pos < len(buffer):
+            if self._in_fence:
+                end = buffer.find("```", pos)
+                if end < 0:
+                    # Code is never spoken; keep only backticks that may start the closing fence
+                    ticks = len(buffer) - len(buffer.rstrip("`"))
+                    pos = len(buffer) if final else max(pos, len(buffer) - min(ticks, 2))
+                    break
+                pos = end + 3
+                self._in_fence = False
+                continue
+            limit = len(buffer) if final else self._safe_end(buffer, pos)
+            if limit <= pos:
+                break
+            consumed = self._emit(out, buffer, pos, limit, final)
+            if consumed == pos:
+                break
+            pos = consumed
+            if not self._in_fence:
+                break
+        self._buffer = buffer[pos - 1:]
+
+    def _safe_end(self, buffer, pos):
+        """Where the last complete whitespace run ends, i.e. before the last word."""
+        end = len(buffer.rstrip())
+        while end > pos and not buffer[end - 1].isspace():
+            end -= 1
+        return end
+
+    def _text(self, out, text):
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return
+        elif self._pending_space and text[0] == " ":
+            self._pending_space += " "
+            text = text[1:]
+            if not text:
+                return
+        if self._pending_space:
+            if self._started:
+                out.append(" " if len(self._pending_space) > 1 else self._pending_space)
+            self._pending_space = ""
+            self._rule_mark = 0
+        out.append(text)
+        self._started = True
+
+    def _emit(self, out, buffer, pos, limit, final):
+        """Normalize buffer[pos:limit]; return the position reached."""
+        for match in TOKEN.finditer(buffer, pos):
+            start = match.start()
+            if start >= limit:
+                break
+            if start > pos:
+                self._text(out, buffer[pos:start])
+            pos = match.end()
+            kind = match.lastgroup
+            if kind == "space":
+                self._pending_space += match.group()
+            elif kind == "emphasis":
+                before = buffer[start - 1]
+                after = buffer[pos] if pos < len(buffer) else " "
+                if (before.isspace() and after.isspace()) or (before.isalnum() and after.isalnum()):
+                    # a * b, and markers inside a word such as snake_case or 5*3
+                    self._text(out, match.group())
+            elif kind == "link":
+                self._text(out, match.group("link"))
+            elif kind == "bracket":
+                if not final and len(buffer) - start < MAX_LINK_CHARS and PARTIAL_LINK.match(buffer, start):
+                    return start
+                self._text(out, "[")
+            elif kind in ("marker", "rule"):
+                # Like the old `^\s*` patterns, blank lines before a list item or rule
+                # go too. Rules were removed after list markers, so a list item can't
+                # reach back past one.
+                newline = self._pending_space.find("\n", self._rule_mark if kind == "marker" else 0)
+                if newline >= 0:
+                    self._pending_space = self._pending_space[:newline + 1]
+                if kind == "rule":
+                    self._rule_mark = len(self._pending_space)
+            elif kind == "fence":
+                self._in_fence = True
+                return pos
+            # code and header are dropped
+        if pos < limit:
+            self._text(out, buffer[pos:limit])
+            pos = limit
+        return pos
+
+def normalize_for_speech(text: str) -> str:
+    normalizer = SpeechNormalizer()
+    return normalizer.feed(text) + normalizer.flush()
@@ -0,0 +1,40 @@
+import re
+
+# A sentence ends at ., ! or ? followed by whitespace, or at a line break
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\s*\n\s*")
+
+class SentenceSplitter:
+    """
+    Cuts streamed text into speakable segments as it arrives.
+
+    Segments end at a sentence boundary and are at least min_chars long, so
+    list markers like "1." and very short sentences ride along with the next
+    one instead of costing a TTS request of their own.
+    """
+
+    def __init__(self, min_chars: int = 40):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str):
+        """Add text; return the segments it completed."""
+        self._buffer += text
+        segments = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            if match.end() == len(self._buffer):
+                # The whitespace run may continue in the next chunk
+                break
+            if match.start() - start >= self.min_chars:
+                segments.append(self._buffer[start:match.start()])
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return segments
+
+    def flush(self):
+        """Return whatever is left once the text is complete."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+    def reset(self):
+        self._buffer = ""
@@ -0,0 +1,195 @@
+from app.config.config import settings
+from dataclasses import dataclass
+from urllib.parse import urlencode
+from websockets.asyncio.client import connect
+from websockets.exceptions import ConnectionClosed
+import asyncio
+import httpx
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+LIVE_OPTIONS = {
+    "punctuate": "true",
+    "language": "en",
+    "interim_results": "true",
+    "endpointing": "300",
+}
+KEEPALIVE_SECONDS = 5
+PRERECORDED_OPTIONS = {
+    "punctuate": "true",
+    "language": "en",
+}
+
+class STTError(RuntimeError):
+    pass
+
+@dataclass
+class Transcript:
+    text: str
+    is_final: bool
+    # The speaker paused: the text so far is a complete utterance
+    speech_final: bool
+
+class LiveTranscriber:
+    """
+    One live speech-to-text session over a Deepgram-compatible WebSocket.
+
+    send() forwards raw audio as it is recorded and results() yields interim and
+    final transcripts while audio keeps flowing. The URL is configurable, so the
+    fake server in app/speech/fake_stt.py can stand in for Deepgram locally.
+    """
+
+    def __init__(self, url: str, api_key: str, options: dict = None):
+        self.url = f"{url}?{urlencode({**LIVE_OPTIONS, **(options or {})})}"
+        self.api_key = api_key
+        self._ws = None
+        self._keepalive = None
+
+    async def __aenter__(self):
+        try:
+            self._ws = await connect(self.url, additional_headers={"Authorization": f"Token {self.api_key}"})
+        except (OSError, asyncio.TimeoutError) as e:
+            raise STTError(f"Could not open live transcription: {e}") from e
+        except Exception as e:
+            raise STTError(f"Live transcription refused the connection: {e}") from e
+        self._keepalive = asyncio.create_task(self._keep_alive())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._keepalive.cancel()
+        await self._ws.close()
+
+    async def _keep_alive(self):
+        # Deepgram closes sessions that receive nothing for ~10s, e.g. while the
+        # user listens to the answer instead of talking.
+        while True:
+            await asyncio.sleep(KEEPALIVE_SECONDS)
+            try:
+                await self._ws.send(json.dumps({"type": "KeepAlive"}))
+            except ConnectionClosed:
+                return
+
+    async def send(self, audio: bytes):
+        try:
+            await self._ws.send(audio)
+        except ConnectionClosed as e:
+            raise STTError(f"Live transcription closed: {e}") from e
+
+    async def finish(self):
+        """Ask for the remaining transcripts; the session closes after sending them."""
+        try:
+            await self._ws.send(json.dumps({"type": "CloseStream"}))
+        except ConnectionClosed:
+            pass
+
+    async def results(self):
+        try:
+            async for raw in self._ws:
+                if isinstance(raw, bytes):
+                    continue
+                data = json.loads(raw)
+                if data.get("type") != "Results":
+                    continue
+                alternatives = data.get("channel", {}).get("alternatives") or [{}]
+                yield Transcript(
+                    text=alternatives[0].get("transcript", ""),
+                    is_final=bool(data.get("is_final")),
+                    speech_final=bool(data.get("speech_final")),
+                )
+        except ConnectionClosed as e:
+            if e.rcvd is None or e.rcvd.code != 1000:
+                raise STTError(f"Live transcription closed: {e}") from e
+
+async def utterances(transcriber: LiveTranscriber, on_interim=None):
+    """
+    Yield complete utterances: final segments are joined until the speaker
+    pauses. `on_interim`, if given, is awaited with every transcript as it arrives.
+    """
+    segments = []
+    async for result in transcriber.results():
+        if on_interim is not None:
+            await on_interim(result)
+        if result.is_final and result.text:
+            segments.append(result.text)
+        if result.speech_final and segments:
+            yield " ".join(segments)
+            segments = []
+    if segments:
+        yield " ".join(segments)
+
+class STTClient:
+    """
+    Deepgram prerecorded transcription over one pooled async httpx client.
+
+    transcribe() sends the audio as the caller yields it, so an upload goes
+    from its spooled file to the API chunk by chunk and is never held whole.
+    """
+
+    def __init__(self, url: str, api_key: str, max_connections: int, timeout: float):
+        self.url = url
+        self.api_key = api_key
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        self.requests = 0
+        self.failed = 0
+        self.bytes_uploaded = 0
+        self._seconds = 0.0
+
+    async def transcribe(self, audio, mimetype: str, size: int = None, options: dict = None) -> str:
+        """
+        Transcribe an async stream of audio chunks; "" if no speech was heard.
+        With `size`, the body is sent with a Content-Length instead of chunked.
+        """
+        started = time.perf_counter()
+        self.requests += 1
+
+        async def counted():
+            async for chunk in audio:
+                self.bytes_uploaded += len(chunk)
+                yield chunk
+
+        headers = {"Authorization": f"Token {self.api_key}", "Content-Type": mimetype}
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        try:
+            response = await self._client.post(
+                self.url,
+                params={**PRERECORDED_OPTIONS, **(options or {})},
+                headers=headers,
+                content=counted(),
+            )
+        except httpx.HTTPError as e:
+            self.failed += 1
+            raise STTError(f"Transcription request failed: {e}") from e
+        if response.status_code != 200:
+            self.failed += 1
+            raise STTError(f"Transcription failed: {response.status_code} {response.text[:500]}")
+        self._seconds += time.perf_counter() - started
+
+        channels = response.json().get("results", {}).get("channels") or [{}]
+        alternatives = channels[0].get("alternatives") or [{}]
+        return alternatives[0].get("transcript", "")
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self):
+        succeeded = self.requests - self.failed
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "bytes_uploaded": self.bytes_uploaded,
+            "avg_seconds": self._seconds / succeeded if succeeded else 0.0,
+        }
+
+stt_client = STTClient(
+    settings.DEEPGRAM_URL,
+    settings.DEEPGRAM_API_KEY,
+    settings.STT_MAX_CONNECTIONS,
+    settings.STT_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,164 @@
+from app.config.config import settings
+from app.speech.tts_cache import TTSAudioCache
+import asyncio
+import httpx
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+ELEVENLABS_TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice}/stream"
+DEFAULT_VOICE = "FGY2WhTYpPnrIDTdsKH5"
+DEFAULT_MODEL = "eleven_monolingual_v1"
+AUDIO_CONTENT_TYPE = "audio/mpeg"
+
+class TTSError(RuntimeError):
+    pass
+
+class TTSClient:
+    """
+    ElevenLabs text-to-speech over one pooled async httpx client.
+
+    stream() yields MP3 bytes as the API produces them, so callers can forward
+    audio to their client without holding the whole clip in memory. With a
+    cache, repeated texts are served from disk instead of the API.
+    """
+
+    def __init__(self, api_key: str, max_connections: int, timeout: float, cache: TTSAudioCache = None):
+        self.api_key = api_key
+        self.cache = cache
+        self._client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        self.requests = 0
+        self.failed = 0
+        self.bytes_streamed = 0
+        self._first_byte_seconds = 0.0
+        self._first_bytes = 0
+
+    async def stream(self, text: str, voice: str = DEFAULT_VOICE, model: str = DEFAULT_MODEL):
+        """Yield the MP3 for `text` chunk by chunk; TTSError if the API refuses it."""
+        if self.cache is None:
+            chunks = self._synthesize(text, voice, model)
+        else:
+            key = self.cache.key(voice, model, text)
+            chunks = await self.cache.read(key)
+            if chunks is None:
+                chunks = self.cache.write_through(key, self._synthesize(text, voice, model))
+        async for chunk in chunks:
+            yield chunk
+
+    async def stream_segments(self, texts, concurrency: int, voice: str = DEFAULT_VOICE, model: str = DEFAULT_MODEL):
+        """
+        Synthesize an async stream of text segments and yield their audio in order.
+
+        Up to `concurrency` segments are synthesized at once. The segment at the
+        head streams straight through; the ones behind it wait in memory until
+        their turn. A failed segment raises TTSError and cancels the rest.
+        """
+        limit = asyncio.Semaphore(concurrency)
+        segments = asyncio.Queue()
+
+        async def synthesize(text, out):
+            try:
+                async with limit:
+                    async for chunk in self.stream(text, voice, model):
+                        out.put_nowait(chunk)
+                out.put_nowait(None)
+            except Exception as e:
+                out.put_nowait(e)
+
+        async def schedule():
+            try:
+                async for text in texts:
+                    out = asyncio.Queue()
+                    segments.put_nowait((asyncio.create_task(synthesize(text, out)), out))
+            finally:
+                segments.put_nowait(None)
+
+        scheduler = asyncio.create_task(schedule())
+        tasks = []
+        try:
+            while (segment := await segments.get()) is not None:
+                task, out = segment
+                tasks.append(task)
+                while (chunk := await out.get()) is not None:
+                    if isinstance(chunk, Exception):
+                        raise chunk if isinstance(chunk, TTSError) else TTSError(str(chunk))
+                    yield chunk
+            # Surface errors from the text source
+            await scheduler
+        finally:
+            scheduler.cancel()
+            while not segments.empty():
+                segment = segments.get_nowait()
+                if segment is not None:
+                    tasks.append(segment[0])
+            for task in tasks:
+                task.cancel()
+
+    async def prewarm(self, texts, voice: str = DEFAULT_VOICE, model: str = DEFAULT_MODEL):
+        """Synthesize fixed phrases into the cache ahead of their first use."""
+        if self.cache is None:
+            return
+        for text in texts:
+            if self.cache.contains(self.cache.key(voice, model, text)):
+                continue
+            try:
+                async for _ in self.stream(text, voice, model):
+                    pass
+            except TTSError as e:
+                logger.warning(f"[TTS] Could not pre-warm phrase {text[:40]!r}: {e}")
+
+    async def _synthesize(self, text: str, voice: str, model: str):
+        self.requests += 1
+        started = time.perf_counter()
+        payload = {
+            "text": text,
+            "model_id": model,
+            "voice_settings": {
+                "stability": 0.5,
+                "similarity_boost": 0.75
+            }
+        }
+        headers = {"xi-api-key": self.api_key, "Accept": AUDIO_CONTENT_TYPE}
+        try:
+            async with self._client.stream("POST", ELEVENLABS_TTS_URL.format(voice=voice), headers=headers, json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise TTSError(f"TTS failed: {response.status_code} {body[:500].decode(errors='replace')}")
+                first = True
+                async for chunk in response.aiter_bytes():
+                    if first:
+                        self._first_byte_seconds += time.perf_counter() - started
+                        self._first_bytes += 1
+                        first = False
+                    self.bytes_streamed += len(chunk)
+                    yield chunk
+        except httpx.HTTPError as e:
+            self.failed += 1
+            raise TTSError(f"TTS request failed: {e}") from e
+        except TTSError:
+            self.failed += 1
+            raise
+        logger.info(f"[TTS] Streamed audio | {len(text)} chars in {time.perf_counter() - started:.2f}s")
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self):
+        return {
+            "cache": self.cache.stats() if self.cache is not None else None,
+            "requests": self.requests,
+            "failed": self.failed,
+            "bytes_streamed": self.bytes_streamed,
+            "avg_first_byte_seconds": self._first_byte_seconds / self._first_bytes if self._first_bytes else 0.0,
+        }
+
+tts_client = TTSClient(
+    settings.ELEVENLABS_API_KEY,
+    settings.TTS_MAX_CONNECTIONS,
+    settings.TTS_TIMEOUT_SECONDS,
+    cache=TTSAudioCache(settings.TTS_CACHE_DIR, settings.TTS_CACHE_MAX_BYTES),
+)
@@ -0,0 +1,158 @@
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+READ_CHUNK_BYTES = 64 * 1024
+
+class TTSAudioCache:
+    """
+    Content-addressed cache of synthesized MP3s on local disk.
+
+    Clips are keyed by a hash of (voice, model, text), so replies that repeat
+    word for word (greetings, fallbacks, error messages) are synthesized once.
+    The directory holds at most max_bytes of audio; the least recently used
+    clips are evicted first. File mtimes record use, so the order survives restarts.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # A single clip may use at most a tenth of the cache
+        self.max_entry_bytes = max_bytes // 10
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        clips = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".tmp"):
+                os.remove(entry.path)
+            elif entry.name.endswith(".mp3"):
+                stat = entry.stat()
+                clips.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(clips):
+            self._entries[key] = size
+            self._bytes += size
+
+    def key(self, voice: str, model: str, text: str) -> str:
+        return hashlib.sha256(f"{voice}\0{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.mp3")
+
+    def _open(self, key: str):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            path = self._path(key)
+            try:
+                # Opened under the lock: an eviction can unlink the file afterwards,
+                # but this handle keeps reading it.
+                clip = open(path, "rb")
+            except FileNotFoundError:
+                self._bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return clip
+
+    async def read(self, key: str):
+        """Yield a cached clip in chunks, or return None on a miss."""
+        clip = await asyncio.to_thread(self._open, key)
+        if clip is None:
+            return None
+
+        async def chunks():
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(clip.read, READ_CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                clip.close()
+
+        return chunks()
+
+    async def write_through(self, key: str, chunks):
+        """
+        Pass `chunks` through unchanged while spooling them to disk; the clip is
+        added to the cache only once the stream has completed.
+        """
+        tmp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            spool = await asyncio.to_thread(open, tmp_path, "wb")
+        except OSError as e:
+            logger.warning(f"TTS cache not writable, streaming uncached: {e}")
+            spool = None
+        size = 0
+        complete = False
+        try:
+            async for chunk in chunks:
+                if spool is not None:
+                    size += len(chunk)
+                    if size > self.max_entry_bytes:
+                        await asyncio.to_thread(spool.close)
+                        spool = None
+                    else:
+                        await asyncio.to_thread(spool.write, chunk)
+                yield chunk
+            complete = spool is not None
+        finally:
+            if spool is not None:
+                await asyncio.to_thread(spool.close)
+            if complete:
+                await asyncio.to_thread(self._commit, key, tmp_path, size)
+            else:
+                await asyncio.to_thread(self._discard, tmp_path)
+
+    def _discard(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _commit(self, key: str, tmp_path: str, size: int):
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            if self._bytes > self.max_bytes:
+                # Trim to 90% so eviction doesn't run on every write once full.
+                while self._entries and self._bytes > self.max_bytes * 0.9:
+                    old_key, old_size = self._entries.popitem(last=False)
+                    self._bytes -= old_size
+                    self.evictions += 1
+                    self._discard(self._path(old_key))
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "clips": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,90 @@
+from starlette.datastructures import UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+# Room for the multipart boundaries and part headers around the file itself
+FORM_OVERHEAD_BYTES = 16 * 1024
+
+class UploadTooLarge(ValueError):
+    pass
+
+class UploadInvalid(ValueError):
+    pass
+
+class SpooledMultiPartParser(MultiPartParser):
+    """
+    Starlette's multipart parser with a per-instance spool size, which also
+    closes its temporary files when the body stream fails, not only on its own
+    parse errors.
+
+    Written against starlette 0.46.2 (see requirements.txt): it relies on the
+    `spool_max_size` class attribute and the `_files_to_close_on_error` list,
+    and refuses to run if either is gone rather than silently losing the spool
+    limit or leaking files.
+    """
+
+    def __init__(self, headers, stream, spool_max_size: int, **kwargs):
+        super().__init__(headers, stream, **kwargs)
+        if not hasattr(MultiPartParser, "spool_max_size") or not hasattr(self, "_files_to_close_on_error"):
+            raise RuntimeError("starlette's MultiPartParser changed; review SpooledMultiPartParser")
+        self.spool_max_size = spool_max_size
+
+    async def parse(self):
+        try:
+            return await super().parse()
+        except MultiPartException:
+            # Starlette has already closed the files
+            raise
+        except BaseException:
+            for file in self._files_to_close_on_error:
+                file.close()
+            raise
+
+async def _capped(stream, limit: int, max_bytes: int):
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > limit:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        yield chunk
+
+async def receive_upload(request: Request, field: str, max_bytes: int, spool_bytes: int) -> UploadFile:
+    """
+    Read the multipart file `field` of `request` into a spooled temporary file.
+
+    Up to `spool_bytes` of it stay in memory; the rest goes to disk as it
+    arrives. A body over `max_bytes` raises UploadTooLarge as soon as it is
+    announced or, failing a Content-Length, as soon as that much has arrived,
+    so an oversized upload is never received in full. The caller closes the
+    returned file.
+    """
+    limit = max_bytes + FORM_OVERHEAD_BYTES
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise UploadTooLarge(f"Upload of {length} bytes exceeds {max_bytes} bytes")
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise UploadInvalid("Expected a multipart/form-data upload")
+
+    parser = SpooledMultiPartParser(
+        request.headers, _capped(request.stream(), limit, max_bytes), spool_bytes, max_files=1, max_fields=10
+    )
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        raise UploadInvalid(str(e)) from e
+
+    upload = form.get(field)
+    if not isinstance(upload, UploadFile):
+        await form.close()
+        raise UploadInvalid(f"Missing file field '{field}'")
+    return upload
+
+async def iter_upload(upload: UploadFile, chunk_size: int = UPLOAD_CHUNK_BYTES):
+    """Yield the upload chunk by chunk from the start, without reading it whole."""
+    await upload.seek(0)
+    while chunk := await upload.read(chunk_size):
+        yield chunk
@@ -0,0 +1,227 @@
+from app.config.config import settings
+from dataclasses import dataclass
+from starlette.datastructures import UploadFile
+from typing import Optional
+import asyncio
+import logging
+import numpy as np
+import struct
+
+logger = logging.getLogger(__name__)
+
+FRAME_MS = 30
+FRAMES_PER_BLOCK = 512
+NOISE_FLOOR_PERCENTILE = 10
+WAV_CHUNK_BYTES = 64 * 1024
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+@dataclass
+class WavInfo:
+    channels: int
+    sample_rate: int
+    sample_width: int
+    is_float: bool
+    # The fmt chunk as uploaded, reused for the trimmed file's header
+    fmt: bytes
+    data_offset: int
+    data_size: int
+
+    @property
+    def block_align(self):
+        return self.channels * self.sample_width
+
+    @property
+    def dtype(self):
+        if self.is_float:
+            return np.dtype("<f4")
+        return np.dtype({1: "u1", 2: "<i2", 4: "<i4"}[self.sample_width])
+
+    @property
+    def frame_count(self):
+        return self.data_size // self.block_align
+
+@dataclass
+class SpeechSpan:
+    info: WavInfo
+    # Sample frames of the clip to keep, [start, end)
+    start: int
+    end: int
+
+    @property
+    def has_speech(self):
+        return self.end > self.start
+
+    @property
+    def duration(self):
+        return self.info.frame_count / self.info.sample_rate
+
+    @property
+    def trimmed_seconds(self):
+        return (self.info.frame_count - (self.end - self.start)) / self.info.sample_rate
+
+    @property
+    def size(self):
+        """Byte size of the trimmed WAV file."""
+        fmt = len(self.info.fmt) + len(self.info.fmt) % 2
+        return 28 + fmt + (self.end - self.start) * self.info.block_align
+
+def read_wav_info(file) -> Optional[WavInfo]:
+    """The layout of a WAV file with PCM or float samples NumPy can read, else None."""
+    file.seek(0, 2)
+    file_size = file.tell()
+    file.seek(0)
+    header = file.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:] != b"WAVE":
+        return None
+    fmt = None
+    while True:
+        chunk = file.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+        if chunk_id == b"fmt ":
+            fmt = file.read(chunk_size)
+            if len(fmt) < 16:
+                return None
+            file.seek(chunk_size % 2, 1)
+        elif chunk_id == b"data":
+            break
+        else:
+            file.seek(chunk_size + chunk_size % 2, 1)
+    if fmt is None:
+        return None
+
+    format_tag, channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", fmt[:16])
+    if format_tag == WAVE_FORMAT_EXTENSIBLE and len(fmt) >= 26:
+        # The real format is the first two bytes of the sub-format GUID
+        format_tag = struct.unpack("<H", fmt[24:26])[0]
+    width = bits // 8
+    is_float = format_tag == WAVE_FORMAT_IEEE_FLOAT
+    if not channels or not sample_rate or bits % 8:
+        return None
+    if not (format_tag == WAVE_FORMAT_PCM and width in (1, 2, 4) or is_float and width == 4):
+        return None
+
+    data_offset = file.tell()
+    # Streaming recorders leave the size at 0 or 0xFFFFFFFF; the file end is the truth
+    data_size = min(chunk_size, file_size - data_offset) if chunk_size else file_size - data_offset
+    return WavInfo(channels, sample_rate, width, is_float, fmt, data_offset, data_size)
+
+class VoiceActivityDetector:
+    """
+    Energy-based voice activity detection for WAV recordings.
+
+    Frames of FRAME_MS are speech when their level is above both an absolute
+    threshold and the clip's own noise floor plus a margin, so a steady hum
+    doesn't count as talking; the relative threshold stays a margin below the
+    loudest frame. Everything before the first and after the last
+    speech frame, beyond some padding, is silence that needn't be transcribed.
+    """
+
+    def __init__(self, threshold_dbfs: float, noise_margin_db: float, padding_ms: int, min_speech_ms: int):
+        self.threshold_dbfs = threshold_dbfs
+        self.noise_margin_db = noise_margin_db
+        self.padding_ms = padding_ms
+        self.min_speech_ms = min_speech_ms
+        self.clips = 0
+        self.rejected = 0
+        self.seconds_received = 0.0
+        self.seconds_trimmed = 0.0
+
+    def frame_levels(self, file, info: WavInfo) -> np.ndarray:
+        """Level of every complete frame in dBFS, reading the samples block by block."""
+        frame_len = max(1, info.sample_rate * FRAME_MS // 1000)
+        frame_bytes = frame_len * info.block_align
+        frames = info.data_size // frame_bytes
+        levels = np.empty(frames, dtype=np.float64)
+        file.seek(info.data_offset)
+        done = 0
+        while done < frames:
+            count = min(FRAMES_PER_BLOCK, frames - done)
+            block = file.read(count * frame_bytes)
+            count = len(block) // frame_bytes
+            if not count:
+                break
+            samples = np.frombuffer(block, dtype=info.dtype, count=count * frame_len * info.channels)
+            if info.is_float:
+                samples = samples.astype(np.float64)
+            elif info.sample_width == 1:
+                samples = (samples.astype(np.float64) - 128.0) / 128.0
+            else:
+                samples = samples / float(2 ** (8 * info.sample_width - 1))
+            power = np.mean(np.square(samples.reshape(count, -1)), axis=1)
+            levels[done:done + count] = 10 * np.log10(power + 1e-12)
+            done += count
+        return levels[:done]
+
+    def detect(self, file) -> Optional[SpeechSpan]:
+        """The span of `file` worth transcribing, or None if it isn't a readable WAV."""
+        info = read_wav_info(file)
+        if info is None or not info.frame_count:
+            return None
+        levels = self.frame_levels(file, info)
+        if not len(levels):
+            return None
+
+        # Without quieter frames the "noise floor" is the speech itself, so the
+        # loudest frames always clear the relative threshold
+        noise_floor = np.percentile(levels, NOISE_FLOOR_PERCENTILE)
+        relative = min(noise_floor, levels.max() - 2 * self.noise_margin_db) + self.noise_margin_db
+        threshold = max(self.threshold_dbfs, relative)
+        speech = np.flatnonzero(levels > threshold)
+        if len(speech) * FRAME_MS < self.min_speech_ms:
+            return SpeechSpan(info, 0, 0)
+
+        frame_len = max(1, info.sample_rate * FRAME_MS // 1000)
+        padding = info.sample_rate * self.padding_ms // 1000
+        start = max(0, speech[0] * frame_len - padding)
+        end = min(info.frame_count, (speech[-1] + 1) * frame_len + padding)
+        return SpeechSpan(info, int(start), int(end))
+
+    async def analyze(self, upload: UploadFile) -> Optional[SpeechSpan]:
+        """detect() on an upload, off the event loop since the file may be on disk."""
+        span = await asyncio.to_thread(self.detect, upload.file)
+        if span is None:
+            return None
+        self.clips += 1
+        self.seconds_received += span.duration
+        self.seconds_trimmed += span.trimmed_seconds
+        if not span.has_speech:
+            self.rejected += 1
+        logger.info(f"[VAD] {span.duration:.2f}s clip | trimmed {span.trimmed_seconds:.2f}s of silence")
+        return span
+
+    def stats(self):
+        return {
+            "clips": self.clips,
+            "rejected": self.rejected,
+            "seconds_received": round(self.seconds_received, 2),
+            "seconds_trimmed": round(self.seconds_trimmed, 2),
+        }
+
+async def iter_speech(upload: UploadFile, span: SpeechSpan, chunk_size: int = WAV_CHUNK_BYTES):
+    """Yield `span` of the upload as a WAV file of its own, chunk by chunk."""
+    info = span.info
+    remaining = (span.end - span.start) * info.block_align
+    yield (
+        struct.pack("<4sI4s", b"RIFF", span.size - 8, b"WAVE")
+        + struct.pack("<4sI", b"fmt ", len(info.fmt)) + info.fmt + b"\0" * (len(info.fmt) % 2)
+        + struct.pack("<4sI", b"data", remaining)
+    )
+    await upload.seek(info.data_offset + span.start * info.block_align)
+    while remaining > 0:
+        chunk = await upload.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+voice_activity = VoiceActivityDetector(
+    settings.VAD_THRESHOLD_DBFS,
+    settings.VAD_NOISE_MARGIN_DB,
+    settings.VAD_PADDING_MS,
+    settings.VAD_MIN_SPEECH_MS,
+)
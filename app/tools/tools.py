@@ -1,414 +1,520 @@
-from langchain_core.tools import tool
-from sqlalchemy import func
+from langchain_core.tools import tool, InjectedToolArg
+from sqlalchemy.orm import Session
+from typing import Annotated
+from sqlalchemy import func, and_, case, cast, true, Date, String
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from app.models.models import RoomType
 import json
 import logging
-from app.models.models import Room, Booking, BookingStatus, User, RoomTypeEnum
-from datetime import date, datetime
+from app.models.models import Room, Booking, BookingRoom, BookingStatus, User, RoomTypeEnum
+from sqlalchemy.dialects.postgresql import Range
+from datetime import date, datetime, timedelta
 from uuid import uuid4
-from sqlalchemy import select
+from sqlalchemy import select, exists
+from sqlalchemy.exc import IntegrityError
+from app.availability.index import availability_index
+from app.catalog.catalog import catalog
 logger = logging.getLogger(__name__)
 
-def make_get_room_types_tool(db_session):
-    @tool
-    def getRoomTypes():
-        """Get all different types of rooms provided by the hotel. Returns a list of room types with their details (type, description, capacity, cost)."""
-        logger.info("getRoomTypes tool called")
-        room_types = db_session.query(RoomType).all()
-        return json.dumps([
-            {
-                "id": str(rt.id),
-                "type": rt.type.value,
-                "description": rt.description,
-                "capacity": rt.capacity,
-                "cost": float(rt.cost)
-            }
-            for rt in room_types
-        ])
-    return getRoomTypes
+# Longest range availability_calendar answers in one call
+MAX_CALENDAR_NIGHTS = 62
+
+@tool
+def getRoomTypes(db_session: Annotated[Session, InjectedToolArg]):
+    """Get all different types of rooms provided by the hotel. Returns a list of room types with their details (type, description, capacity, cost)."""
+    logger.info("getRoomTypes tool called")
+    return json.dumps([
+        {
+            "id": str(rt.id),
+            "type": rt.type,
+            "description": rt.description,
+            "capacity": rt.capacity,
+            "cost": rt.cost
+        }
+        for rt in catalog.room_types()
+    ])
+
+# How many index candidates single_room_booking confirms against the database
+# before falling back to the full availability query.
+INDEX_CANDIDATE_ATTEMPTS = 5
+
+# How often single_room_booking moves on to another room after losing a race.
+BOOKING_ATTEMPTS = 5
+
+# SQLSTATE raised by the no-overlap exclusion constraint on booking_rooms.
+EXCLUSION_VIOLATION = "23P01"
 
 def parse_date(d):
     return datetime.strptime(d, "%Y-%m-%d").date() if isinstance(d, str) else d
 
-def make_get_available_rooms_tool(db_session):
-    @tool
-    def getRooms(check_in: str, check_out: str, room_type: str = None):
-        """Get available rooms between check-in and check-out dates. 
-        Optional room_type parameter to filter by specific room type (Standard, Deluxe, Suite).
-        Returns a list of available rooms with their details."""
-        logger.info(f"getRooms tool called for dates: {check_in} to {check_out}, room_type: {room_type}")
-        
-        # Convert string dates to date objects
-        try:
-            check_in_date = parse_date(check_in)
-            check_out_date = parse_date(check_out)
-        except ValueError as e:
-            return json.dumps({"error": f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}"})
-
-        # Validate dates
-        if check_in_date >= check_out_date:
-            return json.dumps({"error": "Check-in date must be before check-out date"})
-        
-        if check_in_date < date.today():
-            return json.dumps({"error": "Check-in date cannot be in the past"})
-
-        # Get booked rooms for the date range
-        booked_rooms_subq = (
-            db_session.query(func.unnest(Booking.rooms).label('room_id'))
-            .where(
-                Booking.status != BookingStatus.Cancelled,
-                Booking.check_in < check_out_date,
-                Booking.check_out > check_in_date,
-            )
-            .subquery()
-        )
-
-        # Base query for available rooms
-        query = (
-            db_session.query(Room, RoomType)
+def stay_range(check_in, check_out):
+    return Range(check_in, check_out, bounds="[)")
+
+def room_is_taken(check_in, check_out):
+    """Correlated predicate: the outer Room has an active booking overlapping the stay.
+    Served by the GiST index on booking_rooms (room_id, stay)."""
+    return exists().where(
+        BookingRoom.room_id == Room.id,
+        BookingRoom.stay.overlaps(stay_range(check_in, check_out)),
+    )
+
+def count_free_rooms_by_type(db_session, check_in, check_out, use_index=True):
+    """Free rooms per room type for the whole stay, from the index when it covers the dates
+    and use_index is set. Index counts are advisory: see AvailabilityIndex."""
+    if use_index and availability_index.covers(check_in, check_out):
+        return availability_index.count_free_by_type(check_in, check_out)
+
+    # One aggregate over room types; taken rooms are dropped in the join so fully
+    # booked types still come back with a count of 0.
+    rows = (
+        db_session.query(RoomType.type, func.count(Room.id))
+        .outerjoin(Room, and_(Room.room_type_id == RoomType.id, ~room_is_taken(check_in, check_out)))
+        .group_by(RoomType.type)
+        .all()
+    )
+    counts = {e.value: 0 for e in RoomTypeEnum}
+    counts.update({rt.value: count for rt, count in rows})
+    return counts
+
+def availability_calendar(db_session, start, end):
+    """
+    Free rooms per room type for every night in [start, end).
+
+    Raises ValueError for an empty, past or too long range.
+    """
+    if start >= end:
+        raise ValueError("Start date must be before end date")
+    if start < date.today():
+        raise ValueError("Start date cannot be in the past")
+    if (end - start).days > MAX_CALENDAR_NIGHTS:
+        raise ValueError(f"Date range cannot be longer than {MAX_CALENDAR_NIGHTS} nights")
+
+    nights = [start + timedelta(days=i) for i in range((end - start).days)]
+    if availability_index.covers(start, end):
+        per_type = availability_index.free_counts_by_night(start, end)
+        counts = [{room_type: int(per_type[room_type][i]) for room_type in per_type} for i in range(len(nights))]
+    else:
+        # Every night crossed with every room, keeping the rooms with no stay
+        # containing that night, grouped in a single round-trip. render_derived()
+        # names the column, AS nights(night); an alias alone leaves it called nights.
+        series = func.generate_series(start, end - timedelta(days=1), timedelta(days=1)).table_valued("night").render_derived(name="nights")
+        night = cast(series.c.night, Date)
+        rows = (
+            db_session.query(night, RoomType.type, func.count(Room.id))
+            .select_from(series)
+            .join(Room, true())
             .join(RoomType, Room.room_type_id == RoomType.id)
-            .filter(~Room.id.in_(select(booked_rooms_subq.c.room_id)))
+            .filter(~exists().where(BookingRoom.room_id == Room.id, BookingRoom.stay.contains(night)))
+            .group_by(night, RoomType.type)
+            .all()
         )
-
-        # Filter by room type if specified
-        if room_type:
-            try:
-                room_type_enum = RoomTypeEnum(room_type)
-                query = query.filter(RoomType.type == room_type_enum)
-            except ValueError:
-                return json.dumps({"error": f"Invalid room type '{room_type}'. Valid options are: {[e.value for e in RoomTypeEnum]}"})
-
-        available_rooms = query.limit(10).all()  # Limit to prevent overwhelming responses
-
-        if not available_rooms:
-            room_type_msg = f" of type '{room_type}'" if room_type else ""
-            return json.dumps({"error": f"No available rooms{room_type_msg} found for the specified dates"})
-        
-        # Count the number of rooms available for every room type between the check in and check out dates
-        room_type_counts = {}
-        for room, rt in available_rooms:
-            key = rt.type.value
-            room_type_counts[key] = room_type_counts.get(key, 0) + 1
-
-        return json.dumps({
-            "check_in": check_in,
-            "check_out": check_out,
-            "nights": (check_out_date - check_in_date).days,
-            "room_type": room_type,
-            "available_room_count": (
-                room_type_counts.get(room_type)
-                if room_type else sum(room_type_counts.values())
-            )
-        })
-    return getRooms
-
-
-def make_single_room_booking_tool(db_session):
-    @tool
-    def single_room_booking(email: str, room_type: str, check_in: str, check_out: str):
-        """Book a single room between check-in and check-out dates. 
-        If room_number is provided, book that specific room number. Otherwise, book any available room of the specified type.
-        Returns a confirmation message with booking details."""
-        logger.info(f"single_room_booking tool called for {email}, {room_type}, {check_in} to {check_out}")
-
-        # Convert string dates to date objects
-        try:
-            check_in_date = parse_date(check_in)
-            check_out_date = parse_date(check_out)
-        except ValueError as e:
-            return json.dumps({"error": f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}"})
-
-        # Validate dates
-        if check_in_date >= check_out_date:
-            return json.dumps({"error": "Check-in date must be before check-out date"})
-        
-        if check_in_date < date.today():
-            return json.dumps({"error": "Check-in date cannot be in the past"})
-
-        # Find user
-        find_user = db_session.query(User).filter(User.email == email).first()
-        if not find_user:
-            return json.dumps({"error": f"User with email {email} not found"})
-        
-        # Validate room type
+        counts = [{e.value: 0 for e in RoomTypeEnum} for _ in nights]
+        for night_date, rt, count in rows:
+            counts[(night_date - start).days][rt.value] = count
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "nights": [
+            {"date": night_date.isoformat(), "weekday": night_date.strftime("%A"), "available": available}
+            for night_date, available in zip(nights, counts)
+        ],
+    }
+
+@tool
+def getRooms(db_session: Annotated[Session, InjectedToolArg], check_in: str, check_out: str, room_type: str = None):
+    """Get available rooms between check-in and check-out dates. 
+    Optional room_type parameter to filter by specific room type (Standard, Deluxe, Suite).
+    Returns a list of available rooms with their details."""
+    logger.info(f"getRooms tool called for dates: {check_in} to {check_out}, room_type: {room_type}")
+    
+    # Convert string dates to date objects
+    try:
+        check_in_date = parse_date(check_in)
+        check_out_date = parse_date(check_out)
+    except ValueError as e:
+        return json.dumps({"error": f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}"})
+
+    # Validate dates
+    if check_in_date >= check_out_date:
+        return json.dumps({"error": "Check-in date must be before check-out date"})
+    
+    if check_in_date < date.today():
+        return json.dumps({"error": "Check-in date cannot be in the past"})
+
+    # Validate room type if specified
+    if room_type:
         try:
-            room_type_enum = RoomTypeEnum(room_type)
+            RoomTypeEnum(room_type)
         except ValueError:
             return json.dumps({"error": f"Invalid room type '{room_type}'. Valid options are: {[e.value for e in RoomTypeEnum]}"})
 
-        # Get booked rooms for the date range
-        booked_rooms_subq = (
-            db_session.query(func.unnest(Booking.rooms).label('room_id'))
-            .where(
-                Booking.status != BookingStatus.Cancelled,
-                Booking.check_in < check_out_date,
-                Booking.check_out > check_in_date,
-            )
-            .subquery()
+    # Count the number of rooms available for every room type between the check in and check out dates
+    room_type_counts = count_free_rooms_by_type(db_session, check_in_date, check_out_date)
+
+    available_count = room_type_counts.get(room_type, 0) if room_type else sum(room_type_counts.values())
+    if not available_count and availability_index.covers(check_in_date, check_out_date):
+        # The index may not have seen another worker's cancellation yet; only the
+        # database can say the hotel is full.
+        room_type_counts = count_free_rooms_by_type(db_session, check_in_date, check_out_date, use_index=False)
+        available_count = room_type_counts.get(room_type, 0) if room_type else sum(room_type_counts.values())
+    if not available_count:
+        room_type_msg = f" of type '{room_type}'" if room_type else ""
+        return json.dumps({"error": f"No available rooms{room_type_msg} found for the specified dates"})
+
+    return json.dumps({
+        "check_in": check_in,
+        "check_out": check_out,
+        "nights": (check_out_date - check_in_date).days,
+        "room_type": room_type,
+        "available_room_count": available_count,
+        "available_by_type": room_type_counts
+    })
+
+
+def find_free_room(db_session, room_type, check_in, check_out, candidates=None):
+    """
+    Lock and return the RoomInfo of the lowest-numbered free room of the given type, or None.
+
+    Rooms already locked by concurrent bookings are skipped, so parallel requests
+    spread over different rooms instead of queueing on the same one. Only when
+    every free room is locked does this wait for a lock. The exclusion constraint
+    on booking_rooms remains the final guard against double bookings.
+    """
+    query = (
+        db_session.query(Room.id)
+        .filter(
+            ~room_is_taken(check_in, check_out),
+            Room.room_type_id.in_(catalog.room_type_ids(room_type))
         )
-
-        # Book any available room of the requested type
-        available_room = (
-            db_session.query(Room, RoomType)
-            .join(RoomType, Room.room_type_id == RoomType.id)
-            .filter(
-                ~Room.id.in_(db_session.query(booked_rooms_subq.c.room_id)),
-                RoomType.type == room_type_enum
-            )
-            .first()
+        .order_by(Room.room_no)
+    )
+    room_id = None
+    if candidates:
+        room_id = (
+            query.filter(Room.id.in_(candidates[:INDEX_CANDIDATE_ATTEMPTS]))
+            .with_for_update(of=Room, skip_locked=True)
+            .limit(1)
+            .scalar()
         )
-
-        if not available_room:
-            return json.dumps({"error": f"No available {room_type} rooms found for the specified dates"})
-
-        # Calculate total cost
-        nights = (check_out_date - check_in_date).days
-        total_cost = float(available_room.RoomType.cost) * nights
-
-        # Create booking
-        booking = Booking(
-            id=uuid4(),
-            user_id=find_user.id,
-            rooms=[available_room.Room.id],
-            check_in=check_in_date,
-            check_out=check_out_date,
-            status=BookingStatus.Booked
-        )
-
-        try:
-            db_session.add(booking)
-            db_session.commit()
-
-            return json.dumps({
-                "success": True,
-                "booking_confirmation": {
-                    "booking_id": str(booking.id),
-                    "guest_email": email,
-                    "room_number": available_room.Room.room_no,
-                    "room_type": room_type,
-                    "check_in": check_in_date.isoformat(),
-                    "check_out": check_out_date.isoformat(),
-                    "nights": nights,
-                    "cost_per_night": float(available_room.RoomType.cost),
-                    "total_cost": total_cost,
-                    "status": booking.status.value,
-                    "booking_date": datetime.now().isoformat()
-                }
-            })
-        except Exception as e:
+    if room_id is None:
+        room_id = query.with_for_update(of=Room, skip_locked=True).limit(1).scalar()
+    if room_id is None:
+        room_id = query.with_for_update(of=Room).limit(1).scalar()
+    if room_id is None:
+        return None
+
+    room = catalog.rooms().get(room_id)
+    if room is None:
+        # Room added since the catalog was loaded
+        catalog.invalidate()
+        room = catalog.rooms().get(room_id)
+    return room
+
+@tool
+def single_room_booking(db_session: Annotated[Session, InjectedToolArg], email: str, room_type: str, check_in: str, check_out: str):
+    """Book a single room between check-in and check-out dates. 
+    If room_number is provided, book that specific room number. Otherwise, book any available room of the specified type.
+    Returns a confirmation message with booking details."""
+    logger.info(f"single_room_booking tool called for {email}, {room_type}, {check_in} to {check_out}")
+
+    # Convert string dates to date objects
+    try:
+        check_in_date = parse_date(check_in)
+        check_out_date = parse_date(check_out)
+    except ValueError as e:
+        return json.dumps({"error": f"Invalid date format. Use YYYY-MM-DD. Error: {str(e)}"})
+
+    # Validate dates
+    if check_in_date >= check_out_date:
+        return json.dumps({"error": "Check-in date must be before check-out date"})
+    
+    if check_in_date < date.today():
+        return json.dumps({"error": "Check-in date cannot be in the past"})
+
+    # Find user
+    find_user = db_session.query(User).filter(User.email == email).first()
+    if not find_user:
+        return json.dumps({"error": f"User with email {email} not found"})
+    
+    # Validate room type
+    try:
+        RoomTypeEnum(room_type)
+    except ValueError:
+        return json.dumps({"error": f"Invalid room type '{room_type}'. Valid options are: {[e.value for e in RoomTypeEnum]}"})
+
+    # Rooms the in-memory index believes are free, tried first. An empty list is
+    # not trusted: the index may not have seen another worker's cancellation yet,
+    # so find_free_room then searches the database as it does outside the index.
+    candidates = None
+    if availability_index.covers(check_in_date, check_out_date):
+        candidates = availability_index.free_rooms(check_in_date, check_out_date, room_type)
+
+    # Calculate total cost
+    nights = (check_out_date - check_in_date).days
+
+    try:
+        booking = None
+        for attempt in range(BOOKING_ATTEMPTS):
+            available_room = find_free_room(db_session, room_type, check_in_date, check_out_date, candidates)
+            if not available_room:
+                break
+
+            # Create booking
+            try:
+                with db_session.begin_nested():
+                    booking = Booking(
+                        id=uuid4(),
+                        user_id=find_user.id,
+                        rooms=[available_room.id],
+                        check_in=check_in_date,
+                        check_out=check_out_date,
+                        status=BookingStatus.Booked
+                    )
+                    db_session.add(booking)
+                    db_session.flush()
+                    db_session.add(BookingRoom(booking_id=booking.id, room_id=available_room.id, stay=stay_range(check_in_date, check_out_date)))
+                    db_session.flush()
+                break
+            except IntegrityError as e:
+                if getattr(e.orig, "pgcode", None) != EXCLUSION_VIOLATION:
+                    raise
+                # A concurrent booking got this room first; pick another one
+                logger.info(f"Room {available_room.room_no} was taken concurrently, retrying (attempt {attempt + 1})")
+                booking = None
+                if candidates is not None:
+                    candidates = [room_id for room_id in candidates if room_id != available_room.id]
+
+        if booking is None:
             db_session.rollback()
-            logger.error(f"Error creating booking: {str(e)}")
-            return json.dumps({"error": f"Failed to create booking: {str(e)}"})
-
-    return single_room_booking
-
-def make_get_upcoming_bookings_tool(db_session):
-    @tool
-    def get_upcoming_bookings(email: str):
-        """Get all upcoming bookings for a user."""
-        logger.info(f"get_upcoming_bookings tool called for {email}")
-        
-        # Find user
-        find_user = db_session.query(User).filter(User.email == email).first()
-        if not find_user:
-            return json.dumps({"error": f"User with email {email} not found"})
-        
-        # Get upcoming bookings
-        upcoming_bookings = db_session.query(Booking).filter(
-            Booking.user_id == find_user.id,
-            Booking.check_in > datetime.now()
-        ).all()
-
-        if not upcoming_bookings:
-            return json.dumps({"message": "There are no upcoming bookings made by you till now in our hotel."})
-
-        # Flatten all room UUIDs across all bookings
-        room_ids = [room_id for booking in upcoming_bookings for room_id in booking.rooms]
-
-        # Fetch rooms and room types
-        rooms = db_session.query(Room).filter(Room.id.in_(room_ids)).all()
-        room_dict = {room.id: room for room in rooms}
-
-        room_type_ids = list({room.room_type_id for room in rooms})
-        room_types = db_session.query(RoomType).filter(RoomType.id.in_(room_type_ids)).all()
-        room_type_dict = {rt.id: rt for rt in room_types}
-
-        # Return formatted booking info
-        return json.dumps([
-            {
-                "booking_id": str(booking.id),
-                "room_number": room_dict[booking.rooms[0]].room_no if booking.rooms else "N/A",
-                "room_type": room_type_dict[room_dict[booking.rooms[0]].room_type_id].type.value
-                                if booking.rooms else "N/A",
-                "check_in": booking.check_in.isoformat(),
-                "check_out": booking.check_out.isoformat(),
-                "status": booking.status.value
-            }
-            for booking in upcoming_bookings
-        ])
-    return get_upcoming_bookings
-
-def make_get_past_bookings_tool(db_session):
-    @tool
-    def get_past_bookings(email: str):
-        """Get all past bookings for a user."""
-        logger.info(f"get_past_bookings tool called for {email}")
-        
-        # Find user
-        find_user = db_session.query(User).filter(User.email == email).first()
-        if not find_user:
-            return json.dumps({"error": f"User with email {email} not found"})
-        
-        # Get upcoming bookings
-        past_bookings = db_session.query(Booking).filter(
-            Booking.user_id == find_user.id,
-            Booking.check_out < datetime.now()
-        ).all()
-
-        if not past_bookings:
-            return json.dumps({"message": "There are no past bookings made by you till now in our hotel."})
-
-        # Flatten all room UUIDs across all bookings
-        room_ids = [room_id for booking in past_bookings for room_id in booking.rooms]
-
-        # Fetch rooms and room types
-        rooms = db_session.query(Room).filter(Room.id.in_(room_ids)).all()
-        room_dict = {room.id: room for room in rooms}
+            return json.dumps({"error": f"No available {room_type} rooms found for the specified dates"})
 
-        room_type_ids = list({room.room_type_id for room in rooms})
-        room_types = db_session.query(RoomType).filter(RoomType.id.in_(room_type_ids)).all()
-        room_type_dict = {rt.id: rt for rt in room_types}
+        db_session.commit()
+        availability_index.book(booking.rooms, check_in_date, check_out_date)
+        total_cost = available_room.cost * nights
 
-        # Return formatted booking info
-        return json.dumps([
-            {
+        return json.dumps({
+            "success": True,
+            "booking_confirmation": {
                 "booking_id": str(booking.id),
-                "room_number": room_dict[booking.rooms[0]].room_no if booking.rooms else "N/A",
-                "room_type": room_type_dict[room_dict[booking.rooms[0]].room_type_id].type.value
-                                if booking.rooms else "N/A",
-                "check_in": booking.check_in.isoformat(),
-                "check_out": booking.check_out.isoformat(),
-                "status": booking.status.value
+                "guest_email": email,
+                "room_number": available_room.room_no,
+                "room_type": room_type,
+                "check_in": check_in_date.isoformat(),
+                "check_out": check_out_date.isoformat(),
+                "nights": nights,
+                "cost_per_night": available_room.cost,
+                "total_cost": total_cost,
+                "status": booking.status.value,
+                "booking_date": datetime.now().isoformat()
             }
-            for booking in past_bookings
-        ])
-    return get_past_bookings
-
-def make_get_ongoing_bookings_tool(db_session):
-    @tool
-    def get_ongoing_bookings(email: str):
-        """Get all ongoing bookings for a user."""
-        logger.info(f"get_ongoing_bookings tool called for {email}")
-        
-        # Find user
-        find_user = db_session.query(User).filter(User.email == email).first()
-        if not find_user:
+        })
+    except Exception as e:
+        db_session.rollback()
+        logger.error(f"Error creating booking: {str(e)}")
+        return json.dumps({"error": f"Failed to create booking: {str(e)}"})
+
+
+BOOKING_WINDOWS = ("upcoming", "ongoing", "past")
+
+# Page size bounds for get_booking_history
+DEFAULT_HISTORY_LIMIT = 20
+MAX_HISTORY_LIMIT = 50
+
+@tool
+def get_booking_history(db_session: Annotated[Session, InjectedToolArg], email: str, window: str = None, limit: int = DEFAULT_HISTORY_LIMIT, offset: int = 0):
+    """Get a user's bookings, each labelled upcoming, ongoing or past.
+    Optional window parameter (upcoming, ongoing, past) returns only that kind of booking.
+    Results are paginated with limit (max 50) and offset; use has_more to see whether more bookings exist."""
+    logger.info(f"get_booking_history tool called for {email}, window: {window}, limit: {limit}, offset: {offset}")
+
+    if window and window not in BOOKING_WINDOWS:
+        return json.dumps({"error": f"Invalid window '{window}'. Valid options are: {list(BOOKING_WINDOWS)}"})
+    limit = max(1, min(int(limit), MAX_HISTORY_LIMIT))
+    offset = max(0, int(offset))
+
+    # Classify every booking in SQL so filtering, ordering and paging happen in the same pass
+    today = date.today()
+    booking_window = case(
+        (Booking.check_out < today, "past"),
+        (Booking.check_in > today, "upcoming"),
+        else_="ongoing",
+    )
+    window_rank = case(
+        (Booking.check_out < today, 2),
+        (Booking.check_in > today, 1),
+        else_=0,
+    )
+    # render_derived() names the column, AS stay_rooms(room_id); without it Postgres calls it stay_rooms
+    stay_rooms = func.unnest(Booking.rooms).table_valued("room_id").render_derived().lateral("stay_rooms")
+
+    query = (
+        db_session.query(
+            Booking.id,
+            Booking.check_in,
+            Booking.check_out,
+            Booking.status,
+            booking_window.label("window"),
+            func.array_agg(aggregate_order_by(Room.room_no, Room.room_no)).label("room_numbers"),
+            func.min(cast(RoomType.type, String)).label("room_type"),
+            func.count().over().label("total"),
+        )
+        .select_from(Booking)
+        .join(User, User.id == Booking.user_id)
+        .outerjoin(stay_rooms, true())
+        .outerjoin(Room, Room.id == stay_rooms.c.room_id)
+        .outerjoin(RoomType, RoomType.id == Room.room_type_id)
+        .filter(User.email == email)
+        .group_by(Booking.id)
+    )
+    if window:
+        query = query.filter(booking_window == window)
+
+    # Ongoing first, then upcoming soonest-first, then past most-recent-first
+    rows = (
+        query.order_by(window_rank, func.abs(Booking.check_in - today), Booking.id)
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+
+    if not rows:
+        # Only an empty page costs a second query, to tell an unknown email apart
+        if not db_session.query(exists().where(User.email == email)).scalar():
             return json.dumps({"error": f"User with email {email} not found"})
-        
-        # Get upcoming bookings
-        ongoing_bookings = db_session.query(Booking).filter(
-            Booking.user_id == find_user.id,
-            Booking.check_in <= datetime.now(),
-            Booking.check_out >= datetime.now()
-        ).all()
-
-        if not ongoing_bookings:
-            return json.dumps({"message": "There are no ongoing bookings made by you till now in our hotel."})
-
-        # Flatten all room UUIDs across all bookings
-        room_ids = [room_id for booking in ongoing_bookings for room_id in booking.rooms]
-
-        # Fetch rooms and room types
-        rooms = db_session.query(Room).filter(Room.id.in_(room_ids)).all()
-        room_dict = {room.id: room for room in rooms}
-
-        room_type_ids = list({room.room_type_id for room in rooms})
-        room_types = db_session.query(RoomType).filter(RoomType.id.in_(room_type_ids)).all()
-        room_type_dict = {rt.id: rt for rt in room_types}
-
-        # Return formatted booking info
-        return json.dumps([
+        kind = f"{window} " if window else ""
+        return json.dumps({"message": f"There are no {kind}bookings made by you till now in our hotel."})
+
+    total = rows[0].total
+    return json.dumps({
+        "window": window,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "has_more": offset + len(rows) < total,
+        "bookings": [
             {
-                "booking_id": str(booking.id),
-                "room_number": room_dict[booking.rooms[0]].room_no if booking.rooms else "N/A",
-                "room_type": room_type_dict[room_dict[booking.rooms[0]].room_type_id].type.value
-                                if booking.rooms else "N/A",
-                "check_in": booking.check_in.isoformat(),
-                "check_out": booking.check_out.isoformat(),
-                "status": booking.status.value
+                "booking_id": str(row.id),
+                "window": row.window,
+                "room_number": row.room_numbers[0] if row.room_numbers and row.room_numbers[0] is not None else "N/A",
+                "room_type": row.room_type or "N/A",
+                "check_in": row.check_in.isoformat(),
+                "check_out": row.check_out.isoformat(),
+                "status": row.status.value
             }
-            for booking in ongoing_bookings
-        ])
-    return get_ongoing_bookings
-
-def make_update_booking_tool(db_session):
-    @tool
-    def update_booking(booking_id: str, check_in: str, check_out: str, email: str):
-        """Update the check-in and check-out dates of a booking."""
-        logger.info(f"update_booking tool called for {booking_id}, {check_in}, {check_out}, {email}")
-        
-        # Find user
-        find_user = db_session.query(User).filter(User.email == email).first()
-        if not find_user:
-            return json.dumps({"error": f"User with email {email} not found"})
-        
-        # Find booking
-        booking = db_session.query(Booking).filter(Booking.id == booking_id).first()
-        if not booking:
-            return json.dumps({"error": f"Booking with id {booking_id} not found"})
-        
-        # Check if the same user have a booking for the same check in and check out dates
-        existing_booking = db_session.query(Booking).filter(
-            Booking.user_id == find_user.id,
-            Booking.check_in == parse_date(check_in),
-            Booking.check_out == parse_date(check_out),
-            Booking.status != BookingStatus.Cancelled
-        ).first()
-
-        if existing_booking:
-            return json.dumps([
-                {"error": f"You already have a booking for the same dates. Please choose different dates. Booking id: {existing_booking.id} with check in date: {existing_booking.check_in.isoformat()} and check out date: {existing_booking.check_out.isoformat()}"}
-            ])
-        
-        # Update booking
-        booking.check_in = parse_date(check_in)
-        booking.check_out = parse_date(check_out)
-        db_session.commit()
-        
+            for row in rows
+        ]
+    })
+
+
+@tool
+def getAvailabilityCalendar(db_session: Annotated[Session, InjectedToolArg], start_date: str, end_date: str):
+    """Get the number of free rooms per room type for every night from start_date up to (not including) end_date, in one call.
+    Use this instead of repeated getRooms calls to find which nights or weekends are free. Dates are YYYY-MM-DD; at most 62 nights."""
+    logger.info(f"getAvailabilityCalendar tool called for {start_date} to {end_date}")
+
+    try:
+        return json.dumps(availability_calendar(db_session, parse_date(start_date), parse_date(end_date)))
+    except ValueError as e:
+        return json.dumps({"error": str(e)})
+
+@tool
+def update_booking(db_session: Annotated[Session, InjectedToolArg], booking_id: str, check_in: str, check_out: str, email: str):
+    """Update the check-in and check-out dates of a booking."""
+    logger.info(f"update_booking tool called for {booking_id}, {check_in}, {check_out}, {email}")
+    
+    # Find user
+    find_user = db_session.query(User).filter(User.email == email).first()
+    if not find_user:
+        return json.dumps({"error": f"User with email {email} not found"})
+    
+    # Find booking
+    booking = db_session.query(Booking).filter(Booking.id == booking_id).first()
+    if not booking:
+        return json.dumps({"error": f"Booking with id {booking_id} not found"})
+    
+    # Check if the same user have a booking for the same check in and check out dates
+    existing_booking = db_session.query(Booking).filter(
+        Booking.user_id == find_user.id,
+        Booking.check_in == parse_date(check_in),
+        Booking.check_out == parse_date(check_out),
+        Booking.status != BookingStatus.Cancelled
+    ).first()
+
+    if existing_booking:
         return json.dumps([
-            {
-                "booking_id": str(booking.id),
-                "check_in": booking.check_in.isoformat(),
-                "check_out": booking.check_out.isoformat(),
-                "status": booking.status.value
-            }
+            {"error": f"You already have a booking for the same dates. Please choose different dates. Booking id: {existing_booking.id} with check in date: {existing_booking.check_in.isoformat()} and check out date: {existing_booking.check_out.isoformat()}"}
         ])
-    return update_booking
-
-def make_cancel_booking_tool(db_session):
-    @tool
-    def cancel_booking(booking_id: str, email: str):
-        """Cancel a booking."""
-        logger.info(f"cancel_booking tool called for {booking_id}, {email}")
-        
-        # Find user
-        find_user = db_session.query(User).filter(User.email == email).first()
-        if not find_user:
-            return json.dumps({"error": f"User with email {email} not found"})
-        
-        # Find booking
-        booking = db_session.query(Booking).filter(Booking.id == booking_id).first()
-        if not booking:
-            return json.dumps({"error": f"Booking with id {booking_id} not found"})
-        
-        # Cancel booking
-        booking.status = BookingStatus.Cancelled
+    
+    # Update booking
+    old_check_in, old_check_out = booking.check_in, booking.check_out
+    booking.check_in = parse_date(check_in)
+    booking.check_out = parse_date(check_out)
+    try:
+        db_session.query(BookingRoom).filter(BookingRoom.booking_id == booking.id).update(
+            {BookingRoom.stay: stay_range(booking.check_in, booking.check_out)},
+            synchronize_session=False,
+        )
         db_session.commit()
-
+    except IntegrityError as e:
+        db_session.rollback()
+        if getattr(e.orig, "pgcode", None) != EXCLUSION_VIOLATION:
+            raise
         return json.dumps([
-            {
-                "booking_id": str(booking.id),
-                "status": booking.status.value
-            }
+            {"error": f"The room for booking {booking_id} is not available from {check_in} to {check_out}. Please choose different dates."}
         ])
-    return cancel_booking
\ No newline at end of file
+    if booking.status != BookingStatus.Cancelled:
+        availability_index.release(booking.rooms, old_check_in, old_check_out)
+        availability_index.book(booking.rooms, booking.check_in, booking.check_out)
+    
+    return json.dumps([
+        {
+            "booking_id": str(booking.id),
+            "check_in": booking.check_in.isoformat(),
+            "check_out": booking.check_out.isoformat(),
+            "status": booking.status.value
+        }
+    ])
+
+@tool
+def cancel_booking(db_session: Annotated[Session, InjectedToolArg], booking_id: str, email: str):
+    """Cancel a booking."""
+    logger.info(f"cancel_booking tool called for {booking_id}, {email}")
+    
+    # Find user
+    find_user = db_session.query(User).filter(User.email == email).first()
+    if not find_user:
+        return json.dumps({"error": f"User with email {email} not found"})
+    
+    # Find booking
+    booking = db_session.query(Booking).filter(Booking.id == booking_id).first()
+    if not booking:
+        return json.dumps({"error": f"Booking with id {booking_id} not found"})
+    
+    # Cancel booking
+    was_booked = booking.status != BookingStatus.Cancelled
+    booking.status = BookingStatus.Cancelled
+    # booking_rooms only holds active bookings, so cancelling frees the room-nights
+    db_session.query(BookingRoom).filter(BookingRoom.booking_id == booking.id).delete(synchronize_session=False)
+    db_session.commit()
+    if was_booked:
+        availability_index.release(booking.rooms, booking.check_in, booking.check_out)
+
+    return json.dumps([
+        {
+            "booking_id": str(booking.id),
+            "status": booking.status.value
+        }
+    ])
+
+# Tool registry keyed by the name the model calls. Schemas are built once at import;
+# the database session is supplied per call through the injected db_session argument.
+TOOLS = {t.name: t for t in (
+    getRoomTypes,
+    getRooms,
+    getAvailabilityCalendar,
+    single_room_booking,
+    get_booking_history,
+    update_booking,
+    cancel_booking,
+)}
@@ -0,0 +1,116 @@
+from collections import defaultdict
+from dataclasses import dataclass
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PendingText:
+    conversation_id: str
+    text: str
+    metadata: dict
+
+class EmbeddingPipeline:
+    """
+    Embeds and stores chat messages in the background.
+
+    Texts from all conversations are queued and flushed in batches of up to
+    max_batch texts or every max_wait_ms, whichever comes first. Each batch is a
+    single embed_documents call, and the vectors are written per conversation.
+    """
+
+    def __init__(self, embeddings, manager, max_batch: int, max_wait_ms: int, max_queue: int = 10000):
+        self.embeddings = embeddings
+        self.manager = manager
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+        self.batches = 0
+        self.texts_written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, conversation_id: str, text: str, metadata: dict):
+        """Queue a text for embedding without waiting for it."""
+        try:
+            self._queue.put_nowait(PendingText(conversation_id, text, metadata))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"Embedding queue full, dropping message for conversation {conversation_id}")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush whatever is queued and stop the worker."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch):
+        started = time.perf_counter()
+        try:
+            vectors = await self.embeddings.aembed_documents([item.text for item in batch])
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Embedding batch of {len(batch)} failed: {e}")
+            return
+
+        grouped = defaultdict(list)
+        for item, vector in zip(batch, vectors):
+            grouped[item.conversation_id].append((item, vector))
+
+        for conversation_id, rows in grouped.items():
+            try:
+                await asyncio.to_thread(
+                    self.manager.add_embeddings,
+                    conversation_id,
+                    [item.text for item, _ in rows],
+                    [vector for _, vector in rows],
+                    [item.metadata for item, _ in rows],
+                )
+                self.texts_written += len(rows)
+            except Exception as e:
+                self.failed += len(rows)
+                logger.error(f"Vector store write for conversation {conversation_id} failed: {e}")
+
+        self.batches += 1
+        logger.info(f"[Embeddings] Wrote {len(batch)} texts across {len(grouped)} conversations in {time.perf_counter() - started:.3f}s")
+
+    def stats(self):
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "texts_written": self.texts_written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -1,9 +1,20 @@
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
+from collections import OrderedDict
+from contextlib import contextmanager
+from app.config.config import settings
+from app.vectorStore.embedding_cache import CachedEmbeddings
+import logging
 import os
+import threading
+import uuid
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+KEY_LOCK_STRIPES = 64
+
 api_key = os.getenv("OPENAI_API_KEY")
 
 OPENAI_API_KEY = api_key
@@ -11,7 +22,11 @@ OPENAI_API_KEY = api_key
 if not OPENAI_API_KEY:
     raise ValueError("OPENAI_API_KEY is not set")
 
-embeddings = OpenAIEmbeddings(api_key=OPENAI_API_KEY)
+embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(api_key=OPENAI_API_KEY),
+    path=settings.EMBEDDING_CACHE_PATH,
+    max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+)
 
 def get_vectorstore(conversation_id: str):
     try:
@@ -27,4 +42,170 @@ def get_vectorstore(conversation_id: str):
             collection_name=conversation_id,
             embedding_function=embeddings,
             persist_directory=f"./chroma_storage/{conversation_id}",
-        )
\ No newline at end of file
+        )
+
+def close_vectorstore(store):
+    """Stop the Chroma System behind a store and drop it from chromadb's system cache."""
+    client = getattr(store, "_client", None)
+    if client is None:
+        return
+    try:
+        # client._system is looked up in the cache, so take it before the entry goes
+        system = client._system
+        system.stop()
+    except Exception as e:
+        logger.warning(f"Failed to close vector store: {e}")
+        return
+    from chromadb.api.shared_system_client import SharedSystemClient
+    identifier = getattr(client, "_identifier", None)
+    if SharedSystemClient._identifier_to_system.get(identifier) is system:
+        del SharedSystemClient._identifier_to_system[identifier]
+
+class VectorStoreManager:
+    """
+    Keeps up to max_open Chroma stores open, one per conversation, in LRU order.
+
+    Stores are handed out through lease(). An evicted store is retired: it is
+    closed once its last lease is released, unless the conversation is opened
+    again first, in which case the retired store goes back into the cache.
+    """
+
+    def __init__(self, max_open: int):
+        self.max_open = max_open
+        self._stores = OrderedDict()
+        self._leases = {}
+        # conversation_id -> evicted store that is still leased or not closed yet
+        self._retired = {}
+        self._lock = threading.Lock()
+        # Opening and closing a conversation's store happen under its stripe, so
+        # a second handle is never opened: chromadb shares one System per
+        # persist directory, and closing a duplicate would stop the live one.
+        self._key_locks = [threading.Lock() for _ in range(KEY_LOCK_STRIPES)]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _key_lock(self, conversation_id: str):
+        return self._key_locks[hash(conversation_id) % KEY_LOCK_STRIPES]
+
+    def _lease(self, store):
+        self._leases[id(store)] = self._leases.get(id(store), 0) + 1
+
+    def _lease_cached(self, conversation_id: str):
+        """Lease the open store for a conversation, or None; call with self._lock held."""
+        store = self._stores.get(conversation_id)
+        if store is not None:
+            self._stores.move_to_end(conversation_id)
+            self._lease(store)
+            self.hits += 1
+        return store
+
+    def _lease_retired(self, conversation_id: str):
+        """Put a retired store back into the cache and lease it, or None; call with both locks held."""
+        store = self._retired.pop(conversation_id, None)
+        if store is not None:
+            self._stores[conversation_id] = store
+            self._lease(store)
+            self.hits += 1
+        return store
+
+    def _evict(self):
+        """Retire stores over max_open; returns the unleased ones to close. Call with self._lock held."""
+        to_close = []
+        while len(self._stores) > self.max_open:
+            evicted_id, evicted = self._stores.popitem(last=False)
+            self.evictions += 1
+            self._retired[evicted_id] = evicted
+            if not self._leases.get(id(evicted)):
+                to_close.append((evicted_id, evicted))
+        return to_close
+
+    def _checkout(self, conversation_id: str):
+        with self._lock:
+            store = self._lease_cached(conversation_id)
+        if store is not None:
+            return store
+
+        # Open outside the manager lock so a slow open doesn't hold up other conversations.
+        with self._key_lock(conversation_id):
+            with self._lock:
+                store = self._lease_cached(conversation_id) or self._lease_retired(conversation_id)
+            if store is None:
+                store = get_vectorstore(conversation_id)
+                with self._lock:
+                    self._stores[conversation_id] = store
+                    self._leases[id(store)] = 1
+                    self.misses += 1
+            with self._lock:
+                to_close = self._evict()
+
+        # Closed after releasing our stripe, which an evicted store may share
+        for evicted_id, evicted in to_close:
+            self._close(evicted_id, evicted)
+        return store
+
+    def _close(self, conversation_id: str, store):
+        """Close a retired store, unless it was leased or reopened in the meantime."""
+        with self._key_lock(conversation_id):
+            with self._lock:
+                if self._retired.get(conversation_id) is not store or self._leases.get(id(store)):
+                    return
+                del self._retired[conversation_id]
+            close_vectorstore(store)
+
+    def _checkin(self, conversation_id: str, store):
+        with self._lock:
+            remaining = self._leases.get(id(store), 0) - 1
+            if remaining > 0:
+                self._leases[id(store)] = remaining
+                return
+            self._leases.pop(id(store), None)
+            retired = self._retired.get(conversation_id) is store
+        if retired:
+            self._close(conversation_id, store)
+
+    @contextmanager
+    def lease(self, conversation_id: str):
+        store = self._checkout(conversation_id)
+        try:
+            yield store
+        finally:
+            self._checkin(conversation_id, store)
+
+    def add_texts(self, conversation_id: str, texts, metadatas=None):
+        with self.lease(conversation_id) as store:
+            return store.add_texts(texts, metadatas=metadatas)
+
+    def add_embeddings(self, conversation_id: str, texts, vectors, metadatas):
+        """Store texts whose embeddings were computed elsewhere (see EmbeddingPipeline)."""
+        with self.lease(conversation_id) as store:
+            store._collection.upsert(
+                ids=[str(uuid.uuid4()) for _ in texts],
+                embeddings=vectors,
+                documents=texts,
+                metadatas=metadatas,
+            )
+
+    def close_all(self):
+        with self._lock:
+            stores = list(self._stores.items()) + list(self._retired.items())
+            self._stores.clear()
+            self._retired.clear()
+            self._leases.clear()
+        for conversation_id, store in stores:
+            with self._key_lock(conversation_id):
+                close_vectorstore(store)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "open": len(self._stores),
+                "max_open": self.max_open,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+vectorstore_manager = VectorStoreManager(settings.VECTORSTORE_MAX_OPEN)
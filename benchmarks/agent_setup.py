@@ -0,0 +1,94 @@
+"""
+Microbenchmark of the per-request agent setup in /chat.
+
+"before" repeats what every request used to do: build the tools, construct a
+new ChatOpenAI (and with it a new HTTP client) and bind the tool schemas, then
+dispatch a tool call with the request's session. "after" is the per-request
+path now: take the process-wide bound model, look the tool up in TOOLS and run
+it through invoke_tool, which injects a fresh session. The dispatched tool is a
+no-op with the same injected db_session argument as the real ones, so database
+work (identical either way) doesn't drown out the setup cost; sessions are
+created but never connect. No network calls are made; any non-empty
+OPENAI_API_KEY will do, plus the other settings the app needs to import.
+
+    OPENAI_API_KEY=sk-test python benchmarks/agent_setup.py --iterations 200
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Annotated
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.tools import InjectedToolArg, tool
+from langchain_openai import ChatOpenAI
+from sqlalchemy.orm import Session
+
+from app.agent.runtime import invoke_tool, llm_with_tools
+from app.db.session import SessionLocal
+from app.tools.tools import TOOLS
+
+TOOL_NAME = "getRoomTypes"
+
+
+@tool
+def noop_tool(db_session: Annotated[Session, InjectedToolArg], room_type: str = ""):
+    """Stand-in for a tool call that does no database work."""
+    return room_type
+
+
+def setup_before():
+    tools = {name: tool(t.func) for name, t in TOOLS.items()}
+    llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), temperature=0.2, model="gpt-4o-mini")
+    return llm.bind_tools(list(tools.values())), tools
+
+
+def request_before():
+    db = SessionLocal()
+    try:
+        bound, tools = setup_before()
+        setup_done = time.perf_counter()
+        tools.get(TOOL_NAME)
+        noop_tool.invoke({"room_type": "Deluxe", "db_session": db})
+    finally:
+        db.close()
+    return bound, setup_done
+
+
+def request_after():
+    bound = llm_with_tools
+    setup_done = time.perf_counter()
+    TOOLS.get(TOOL_NAME)
+    invoke_tool(noop_tool, {"room_type": "Deluxe"})
+    return bound, setup_done
+
+
+def timed(request, iterations):
+    setup = total = 0.0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        _, setup_done = request()
+        finished = time.perf_counter()
+        setup += setup_done - started
+        total += finished - started
+    return setup / iterations, total / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    # Warm up imports and caches on both paths first
+    request_before()
+    request_after()
+
+    print(f"{'':8} {'setup ms':>10} {'request ms':>11}")
+    for label, request in (("before", request_before), ("after", request_after)):
+        setup, total = timed(request, args.iterations)
+        print(f"{label:8} {setup * 1000:>10.4f} {total * 1000:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Fire many parallel single_room_booking calls at a small inventory.
+
+Every worker books the same room type for the same stay, each on its own
+session, so they all compete for the same few rooms. Reports throughput,
+per-call latency, how many bookings succeeded, and any double-booked
+room-nights found afterwards. The stay defaults to a date far beyond the
+availability index, so every call goes through the database path. Bookings
+created by the run are deleted at the end unless --keep is given.
+
+    python benchmarks/booking_load_test.py --email guest@example.com --requests 300 --workers 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from app.db.session import SessionLocal
+from app.tools.tools import single_room_booking
+
+DOUBLE_BOOKINGS = """
+SELECT count(*) FROM (
+    SELECT r1.room_id
+    FROM hotelassistant.bookings b1
+    CROSS JOIN LATERAL unnest(b1.rooms) AS r1(room_id)
+    JOIN hotelassistant.bookings b2 ON b1.id < b2.id
+    CROSS JOIN LATERAL unnest(b2.rooms) AS r2(room_id)
+    WHERE r1.room_id = r2.room_id
+      AND b1.status = 'Booked' AND b2.status = 'Booked'
+      AND b1.check_in < b2.check_out AND b2.check_in < b1.check_out
+      AND b1.id = ANY(CAST(:ids AS uuid[])) AND b2.id = ANY(CAST(:ids AS uuid[]))
+) conflicts
+"""
+
+
+def book(email, room_type, check_in, check_out, latencies):
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        return json.loads(single_room_booking.invoke({
+            "db_session": db,
+            "email": email,
+            "room_type": room_type,
+            "check_in": check_in,
+            "check_out": check_out,
+        }))
+    finally:
+        db.close()
+        latencies.append(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--email", required=True, help="registered user to book for")
+    parser.add_argument("--room-type", default="Standard")
+    parser.add_argument("--check-in", default="2090-01-10")
+    parser.add_argument("--check-out", default="2090-01-12")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    latencies = []
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(
+            lambda _: book(args.email, args.room_type, args.check_in, args.check_out, latencies),
+            range(args.requests),
+        ))
+    elapsed = time.perf_counter() - started
+
+    booking_ids = [r["booking_confirmation"]["booking_id"] for r in results if r.get("success")]
+    errors = {}
+    for r in results:
+        if not r.get("success"):
+            errors[r.get("error")] = errors.get(r.get("error"), 0) + 1
+
+    db = SessionLocal()
+    try:
+        conflicts = db.execute(text(DOUBLE_BOOKINGS), {"ids": booking_ids}).scalar() if booking_ids else 0
+        if not args.keep and booking_ids:
+            db.execute(text("DELETE FROM hotelassistant.bookings WHERE id = ANY(CAST(:ids AS uuid[]))"), {"ids": booking_ids})
+            db.commit()
+    finally:
+        db.close()
+
+    print(f"requests:        {args.requests} ({args.workers} in parallel)")
+    print(f"elapsed:         {elapsed:.2f}s ({args.requests / elapsed:.1f} bookings attempted/s)")
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"latency:         p50 {cuts[49] * 1000:.0f} ms, p95 {cuts[94] * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms")
+    print(f"booked:          {len(booking_ids)}")
+    for error, count in errors.items():
+        print(f"rejected:        {count} x {error}")
+    print(f"double bookings: {conflicts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+EXPLAIN ANALYZE the room availability query before and after booking_rooms.
+
+Seeds --bookings rows (default 1M) spread over the existing rooms inside a
+single transaction, runs both versions of the "free rooms between X and Y"
+query and rolls everything back, so the database is left untouched. Needs the
+booking_rooms migration applied and at least one room.
+
+    python benchmarks/booking_rooms_explain.py --database-url $POSTGRES_URL
+"""
+import argparse
+import uuid
+
+from sqlalchemy import create_engine, text
+
+SEED_BOOKINGS = """
+WITH r AS (SELECT array_agg(id ORDER BY room_no) AS ids, count(*) AS n FROM hotelassistant.rooms)
+INSERT INTO hotelassistant.bookings (id, user_id, rooms, check_in, check_out, status)
+SELECT gen_random_uuid(), :user_id, ARRAY[r.ids[1 + (g % r.n)]],
+       DATE '2000-01-01' + ((g / r.n) * 3)::int,
+       DATE '2000-01-01' + ((g / r.n) * 3)::int + 1 + (g % 3),
+       'Booked'
+FROM r, generate_series(0, :bookings - 1) AS g
+"""
+
+SEED_BOOKING_ROOMS = """
+INSERT INTO hotelassistant.booking_rooms (booking_id, room_id, stay)
+SELECT b.id, b.rooms[1], daterange(b.check_in, b.check_out, '[)')
+FROM hotelassistant.bookings b
+WHERE b.user_id = :user_id
+"""
+
+BEFORE = """
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT rooms.id FROM hotelassistant.rooms
+WHERE rooms.id NOT IN (
+    SELECT unnest(bookings.rooms) FROM hotelassistant.bookings
+    WHERE bookings.status != 'Cancelled'
+      AND bookings.check_in < :check_out AND bookings.check_out > :check_in
+)
+"""
+
+AFTER = """
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT rooms.id FROM hotelassistant.rooms
+WHERE NOT EXISTS (
+    SELECT 1 FROM hotelassistant.booking_rooms
+    WHERE booking_rooms.room_id = rooms.id
+      AND booking_rooms.stay && daterange(:check_in, :check_out, '[)')
+)
+"""
+
+
+def explain(conn, label, sql, params, repeat):
+    """Print the plan of the last of `repeat` runs and every run's execution time."""
+    times = []
+    for _ in range(repeat):
+        plan = [row[0] for row in conn.execute(text(sql), params)]
+        times.append(next(line for line in plan if line.startswith("Execution Time")).split(": ")[1])
+    print(f"--- {label} ---")
+    print("\n".join(plan))
+    print(f"Execution times over {repeat} runs: {', '.join(times)}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--bookings", type=int, default=1_000_000)
+    parser.add_argument("--check-in", default="2050-06-01")
+    parser.add_argument("--check-out", default="2050-06-04")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per query; the first one reads from disk")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    user_id = uuid.uuid4()
+    params = {"check_in": args.check_in, "check_out": args.check_out}
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            conn.execute(
+                text("INSERT INTO hotelassistant.users (id, email, hashpass) VALUES (:id, :email, 'x')"),
+                {"id": user_id, "email": f"explain-{user_id}@example.com"},
+            )
+            conn.execute(text(SEED_BOOKINGS), {"user_id": user_id, "bookings": args.bookings})
+            conn.execute(text(SEED_BOOKING_ROOMS), {"user_id": user_id})
+            conn.execute(text("ANALYZE hotelassistant.bookings"))
+            conn.execute(text("ANALYZE hotelassistant.booking_rooms"))
+            explain(conn, "before: unnest(bookings.rooms) anti-join", BEFORE, params, args.repeat)
+            explain(conn, "after: booking_rooms overlap (GiST)", AFTER, params, args.repeat)
+        finally:
+            trans.rollback()
+
+
+if __name__ == "__main__":
+    main()
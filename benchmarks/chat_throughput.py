@@ -0,0 +1,70 @@
+"""
+Measure /chat throughput as the number of concurrent conversations grows.
+
+Run against a live server (uvicorn main:app) with a registered user:
+
+    python benchmarks/chat_throughput.py --base-url http://localhost:8000 --user-id <uuid>
+
+Each level creates that many fresh conversations and sends the same number of
+turns in each one concurrently. With a blocking /chat the requests/sec stays
+flat as concurrency grows; with the async agent loop it should scale until the
+tool pool or the OpenAI rate limit becomes the bottleneck.
+
+To measure the server rather than OpenAI, point it at benchmarks/fake_openai.py,
+which answers every call after a fixed latency:
+
+    python benchmarks/fake_openai.py --port 8010 --latency-ms 500
+    OPENAI_API_BASE=http://localhost:8010/v1 uvicorn main:app
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run_conversation(client, user_id, turns, message, latencies):
+    conv = await client.post("/conversations", json={"user_id": user_id})
+    conv.raise_for_status()
+    conversation_id = conv.json()["id"]
+    for _ in range(turns):
+        started = time.perf_counter()
+        resp = await client.post("/chat", json={
+            "conversation_id": conversation_id,
+            "message": message,
+            "sender": "User",
+        })
+        resp.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_level(base_url, user_id, concurrency, turns, message):
+    latencies = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_conversation(client, user_id, turns, message, latencies)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, statistics.median(latencies)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--levels", default="1,2,4,8,16")
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--message", default="What room types do you have?")
+    args = parser.parse_args()
+
+    print(f"{'conversations':>14} {'req/s':>8} {'p50 (s)':>8}")
+    for level in [int(x) for x in args.levels.split(",")]:
+        throughput, p50 = await run_level(args.base_url, args.user_id, level, args.turns, args.message)
+        print(f"{level:>14} {throughput:>8.2f} {p50:>8.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
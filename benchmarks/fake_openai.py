@@ -0,0 +1,87 @@
+"""
+A stand-in for the OpenAI chat and embeddings API, for benchmarks that shouldn't
+depend on OpenAI's latency or rate limits.
+
+Every chat completion waits --latency-ms, like a model round-trip would, then
+answers with the same plain reply and no tool calls (streamed as one content
+chunk when asked to). Embeddings are deterministic vectors derived from the
+input, so caches behave as with the real API.
+
+    python benchmarks/fake_openai.py --port 8010 --latency-ms 500
+    OPENAI_API_BASE=http://localhost:8010/v1 uvicorn main:app
+
+OpenAIEmbeddings tokenizes with tiktoken first, which downloads its encoding on
+first use unless TIKTOKEN_CACHE_DIR already holds it.
+"""
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+import uvicorn
+
+REPLY = "We have Standard, Deluxe and Suite rooms. Which dates would you like to stay?"
+EMBEDDING_DIMENSIONS = 64
+
+def create_app(latency: float):
+    async def chat_completions(request):
+        body = await request.json()
+        await asyncio.sleep(latency)
+        created = int(time.time())
+        if body.get("stream"):
+            def chunk(delta, finish_reason=None):
+                return "data: " + json.dumps({
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                }) + "\n\n"
+
+            async def events():
+                yield chunk({"role": "assistant", "content": REPLY})
+                yield chunk({}, "stop")
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+        return JSONResponse({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": created,
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": REPLY}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    async def embeddings(request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, item in enumerate(inputs):
+            digest = hashlib.sha256(json.dumps(item).encode()).digest()
+            vector = [(digest[j % len(digest)] - 128) / 128 for j in range(EMBEDDING_DIMENSIONS)]
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        return JSONResponse({
+            "object": "list",
+            "data": data,
+            "model": body["model"],
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        })
+
+    return Starlette(routes=[
+        Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+        Route("/v1/embeddings", embeddings, methods=["POST"]),
+    ])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--latency-ms", type=int, default=500)
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms / 1000), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Compare the markdown-to-speech normalizer with the old 14-pass regex cleaner.
+
+Generates long, reply-like markdown (headers, lists, bold, links, code blocks,
+rules) and times, per reply size:
+  legacy      clean_markdown_for_tts as it was, on the complete text
+  one-shot    normalize_for_speech on the complete text
+  streamed    SpeechNormalizer fed in model-sized chunks of a few characters
+It also checks that all three produce the same text. No network or settings needed.
+
+    python benchmarks/speech_normalizer.py --sizes 2000 20000 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.speech.normalizer import SpeechNormalizer, normalize_for_speech
+
+
+def clean_markdown_for_tts(text):
+    """The cleaner /voice-chat used before the incremental normalizer (copied verbatim)."""
+    # Replace code blocks
+    text = re.sub(r'```[\s\S]*?```', '', text)
+
+    # Replace inline code
+    text = re.sub(r'`([^`]+)`', r'\1', text)
+
+    # Replace headers
+    text = re.sub(r'#{1,6}\s+(.*)', r'\1', text)
+
+    # Replace bold/italic
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Bold
+    text = re.sub(r'\*([^*]+)\*', r'\1', text)      # Italic
+    text = re.sub(r'__([^_]+)__', r'\1', text)      # Bold
+    text = re.sub(r'_([^_]+)_', r'\1', text)        # Italic
+
+    # Replace bullet points and numbered lists
+    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
+
+    # Replace links but keep text
+    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
+
+    # Replace horizontal rules
+    text = re.sub(r'^\s*[-*_]{3,}\s*$', '', text, flags=re.MULTILINE)
+
+    # Replace extra newlines and spaces
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r'\s{2,}', ' ', text)
+
+    return text.strip()
+
+
+WORDS = ("Deluxe Suite Standard room booking 2025-06-08 $150/night guests "
+         "guest@example.com Wi-Fi, breakfast. included! view? 3 nights").split()
+
+
+def inline(rng):
+    word = rng.choice(WORDS)
+    roll = rng.random()
+    if roll < 0.08:
+        return f"**{word}**"
+    if roll < 0.12:
+        return f"*{word}*"
+    if roll < 0.16:
+        return f"`{word}`"
+    if roll < 0.19:
+        return f"[{word} here](https://example.com/{word})"
+    return word
+
+
+def line(rng):
+    body = " ".join(inline(rng) for _ in range(rng.randint(3, 14)))
+    roll = rng.random()
+    if roll < 0.15:
+        return "- " + body
+    if roll < 0.25:
+        return f"{rng.randint(1, 9)}. " + body
+    if roll < 0.30:
+        return "### " + body
+    if roll < 0.32:
+        return "---"
+    if roll < 0.34:
+        return "```json\n{\"room\": 101, \"nights\": 2}\n```"
+    if roll < 0.42:
+        return ""
+    return body
+
+
+def reply(rng, size):
+    lines = []
+    length = 0
+    while length < size:
+        lines.append(line(rng))
+        length += len(lines[-1]) + 1
+    return "\n".join(lines)
+
+
+def streamed(text, rng):
+    normalizer = SpeechNormalizer()
+    # Chunk boundaries are fixed up front so only the normalizer is timed
+    cuts = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 8)
+        cuts.append(text[pos:pos + step])
+        pos += step
+    started = time.perf_counter()
+    parts = [normalizer.feed(chunk) for chunk in cuts]
+    parts.append(normalizer.flush())
+    return "".join(parts), time.perf_counter() - started, len(cuts)
+
+
+def timed(func, text, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func(text)
+    return result, (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000, 200000])
+    parser.add_argument("--replies", type=int, default=20, help="replies generated per size")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'size':>8} {'legacy ms':>10} {'one-shot ms':>12} {'streamed ms':>12} {'us/chunk':>9} {'identical':>10}")
+    for size in args.sizes:
+        legacy_total = oneshot_total = streamed_total = 0.0
+        identical = chunks = 0
+        repeat = max(1, 200000 // size)
+        for _ in range(args.replies):
+            text = reply(rng, size)
+            legacy, legacy_time = timed(clean_markdown_for_tts, text, repeat)
+            oneshot, oneshot_time = timed(normalize_for_speech, text, repeat)
+            incremental, streamed_time, chunk_count = streamed(text, rng)
+            chunks += chunk_count
+            legacy_total += legacy_time
+            oneshot_total += oneshot_time
+            streamed_total += streamed_time
+            identical += legacy == oneshot == incremental
+        n = args.replies
+        print(f"{size:>8} {legacy_total / n * 1000:>10.3f} {oneshot_total / n * 1000:>12.3f} "
+              f"{streamed_total / n * 1000:>12.3f} {streamed_total / chunks * 1e6:>9.2f} {identical:>7}/{n}")
+
+
+if __name__ == "__main__":
+    main()
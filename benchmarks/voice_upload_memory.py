@@ -0,0 +1,155 @@
+"""
+Measure worker memory while /voice-chat receives many large recordings at once.
+
+Runs N concurrent uploads of a multipart body with a SIZE_MB recording, fed in
+64 KiB network-sized chunks, through both ways of receiving them:
+  before      request.form() as an UploadFile parameter does, then file.read()
+              and the whole recording handed to transcription as one buffer
+  after       receive_upload() into a capped spooled file, then iter_upload()
+              streamed to transcription chunk by chunk
+Transcription is a stand-in that consumes the audio and waits `--latency`
+seconds, so every upload is in flight at the same time. Each mode runs in its
+own process; the report shows peak RSS growth and the tracemalloc peak.
+
+    python benchmarks/voice_upload_memory.py --uploads 50 --size-mb 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from app.speech.upload import receive_upload, iter_upload
+
+BOUNDARY = "benchmark-boundary"
+CHUNK_BYTES = 64 * 1024
+
+
+def multipart_body(size):
+    head = (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="recording.webm"\r\n'
+        "Content-Type: audio/webm\r\n\r\n"
+    ).encode()
+    return head + os.urandom(size) + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def request_for(body):
+    sent = 0
+
+    async def receive():
+        nonlocal sent
+        # Yield to the other uploads between chunks, like a socket would
+        await asyncio.sleep(0)
+        chunk = body[sent:sent + CHUNK_BYTES]
+        sent += len(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": sent < len(body)}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/voice-chat",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    return Request(scope, receive)
+
+
+async def transcribe_buffer(audio, latency):
+    await asyncio.sleep(latency)
+    return len(audio)
+
+
+async def transcribe_stream(chunks, latency):
+    received = 0
+    async for chunk in chunks:
+        received += len(chunk)
+    await asyncio.sleep(latency)
+    return received
+
+
+async def before(body, latency, max_bytes, spool_bytes):
+    form = await request_for(body).form()
+    file = form["file"]
+    audio_data = await file.read()
+    try:
+        return await transcribe_buffer(audio_data, latency)
+    finally:
+        await form.close()
+
+
+async def after(body, latency, max_bytes, spool_bytes):
+    upload = await receive_upload(request_for(body), "file", max_bytes, spool_bytes)
+    try:
+        return await transcribe_stream(iter_upload(upload), latency)
+    finally:
+        await upload.close()
+
+
+def rss_bytes():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def run_mode(mode, args):
+    handler = before if mode == "before" else after
+    size = int(args.size_mb * 1024 * 1024)
+    # One shared body: the uploads measure what receiving costs, not the test data
+    body = multipart_body(size)
+    baseline = rss_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    received = await asyncio.gather(*(
+        handler(body, args.latency, args.max_mb * 1024 * 1024, args.spool_kb * 1024)
+        for _ in range(args.uploads)
+    ))
+    elapsed = time.perf_counter() - started
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert all(n == size for n in received), "an upload arrived incomplete"
+    return {
+        "rss_growth": rss_bytes() - baseline,
+        "traced_peak": traced_peak,
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=5)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds the stand-in transcription takes")
+    parser.add_argument("--max-mb", type=int, default=25, help="VOICE_UPLOAD_MAX_BYTES for the new path, in MiB")
+    parser.add_argument("--spool-kb", type=int, default=256, help="VOICE_UPLOAD_SPOOL_BYTES for the new path, in KiB")
+    parser.add_argument("--mode", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(asyncio.run(run_mode(args.mode, args))))
+        return
+
+    mib = 1024 * 1024
+    print(f"{args.uploads} concurrent uploads of {args.size_mb:g} MiB")
+    print(f"{'mode':>8} {'peak RSS growth MiB':>20} {'tracemalloc peak MiB':>21} {'seconds':>8}")
+    for mode in ("before", "after"):
+        # A fresh process per mode, since peak RSS never goes back down
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode] + sys.argv[1:],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.splitlines()[-1])
+        print(f"{mode:>8} {result['rss_growth'] / mib:>20.1f} {result['traced_peak'] / mib:>21.1f} {result['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,37 @@
-from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Request, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from app.db.session import SessionLocal
+from app.db.session import SessionLocal, AsyncSessionLocal, async_engine, pool_stats
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.schemas import MessageCreate, MessageResponse, UserCreate, UserLogin, UserResponse, ConversationCreate, ConversationResponse
 from app.crud import crud
-from app.vectorStore.vectorstore import get_vectorstore, embeddings
+from app.vectorStore.vectorstore import vectorstore_manager, embeddings
+from app.vectorStore.pipeline import EmbeddingPipeline
+from app.availability.index import availability_index
+from app.catalog.catalog import catalog
+from app.history.history import history_cache
+from app.speech.tts import tts_client, TTSError, AUDIO_CONTENT_TYPE
+from app.speech.sentences import SentenceSplitter
+from app.speech.normalizer import SpeechNormalizer, normalize_for_speech
+from app.speech.stt import LiveTranscriber, STTError, utterances, stt_client
+from app.speech.upload import receive_upload, iter_upload, UploadTooLarge, UploadInvalid
+from app.speech.vad import voice_activity, iter_speech
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage, ToolMessage
 from app.models.models import Message, Conversation, User
 from uuid import UUID
-from datetime import datetime
-from langchain_openai import ChatOpenAI
+from typing import Optional
+from datetime import datetime, date, timedelta, timezone
 import os
 from fastapi.middleware.cors import CORSMiddleware
-from app.tools.tools import make_get_room_types_tool, make_get_available_rooms_tool, make_single_room_booking_tool, make_get_upcoming_bookings_tool, make_get_ongoing_bookings_tool, make_get_past_bookings_tool, make_update_booking_tool, make_cancel_booking_tool
-from fastapi import BackgroundTasks
+from app.tools.tools import TOOLS, availability_calendar
 from app.utils.email_utils import send_booking_confirmation
+from app.agent import runtime
+from app.agent.runtime import run_blocking, invoke_tool, run_tool_calls, llm, llm_with_tools
 from app.config.config import settings
 from fastapi import File, UploadFile
 from io import BytesIO
-from deepgram import Deepgram
 from fastapi.responses import StreamingResponse
 from starlette.background import BackgroundTask
 import aiofiles
@@ -33,9 +46,6 @@ import uuid
 from fastapi.responses import FileResponse
 # from elevenlabs import generate, set_api_key, save
 import os
-import requests
-import base64
-import re
 from starlette.middleware.base import BaseHTTPMiddleware
 import time
 
@@ -92,6 +102,61 @@ app.add_middleware(
     max_age=3600,
 )
 
+embedding_pipeline = EmbeddingPipeline(
+    embeddings,
+    vectorstore_manager,
+    max_batch=settings.EMBEDDING_BATCH_SIZE,
+    max_wait_ms=settings.EMBEDDING_BATCH_WAIT_MS,
+)
+
+@app.on_event("startup")
+async def start_embedding_pipeline():
+    embedding_pipeline.start()
+
+def refresh_availability_index():
+    db = SessionLocal()
+    try:
+        return availability_index.refresh(db)
+    finally:
+        db.close()
+
+async def reconcile_availability_index():
+    while True:
+        await asyncio.sleep(settings.AVAILABILITY_RECONCILE_SECONDS)
+        try:
+            await run_blocking(refresh_availability_index)
+        except Exception as e:
+            logger.error(f"Availability index refresh failed: {e}")
+
+@app.on_event("startup")
+async def start_availability_index():
+    try:
+        await run_blocking(catalog.rooms)
+        await run_blocking(refresh_availability_index)
+    except Exception as e:
+        # Tools fall back to querying the database until the next refresh succeeds
+        logger.error(f"Availability index build failed: {e}")
+    app.state.availability_reconciler = asyncio.create_task(reconcile_availability_index())
+
+@app.on_event("startup")
+async def prewarm_tts_cache():
+    # In the background: startup shouldn't wait on the TTS API
+    # Cut the way spoken_turn cuts them, so the cache keys match
+    phrases = [segment for reply in STATIC_REPLIES for segment in speech_segments(reply)]
+    app.state.tts_prewarm = asyncio.create_task(tts_client.prewarm(phrases))
+
+@app.on_event("shutdown")
+async def shutdown_agent_runtime():
+    app.state.availability_reconciler.cancel()
+    app.state.tts_prewarm.cancel()
+    await embedding_pipeline.stop()
+    await runtime.shutdown()
+    vectorstore_manager.close_all()
+    embeddings.close()
+    await tts_client.aclose()
+    await stt_client.aclose()
+    await async_engine.dispose()
+
 def get_db():
     db = SessionLocal()
     try:
@@ -103,162 +168,186 @@ def get_db():
     finally:
         db.close()
 
-deepgram_api_key=os.getenv("DEEPGRAM_API_KEY")
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        try:
+            yield db
+            await db.commit()
+        except:
+            await db.rollback()
+            raise
 
-def clean_markdown_for_tts(text):
-    """
-    Remove markdown formatting for better text-to-speech results
-    while keeping punctuation like periods, commas, and @ symbols.
+
+MULTIPART_BOUNDARY = "voice-chat-part"
+
+def multipart_part(content_type):
+    return f"--{MULTIPART_BOUNDARY}\r\nContent-Type: {content_type}\r\n\r\n".encode()
+
+def multipart_end():
+    return f"--{MULTIPART_BOUNDARY}--\r\n".encode()
+
+# Voice turns run as tasks of their own; the loop only keeps weak references
+voice_turns = set()
+
+def speech_segments(text):
+    """The segments a complete reply is synthesized as, one TTS request (and cache entry) each."""
+    splitter = SentenceSplitter()
+    return splitter.feed(normalize_for_speech(text)) + splitter.flush()
+
+async def spoken_turn(user_msg: MessageCreate, on_event=None):
     """
-    # Replace code blocks
-    text = re.sub(r'```[\s\S]*?```', '', text)
-    
-    # Replace inline code
-    text = re.sub(r'`([^`]+)`', r'\1', text)
-    
-    # Replace headers
-    text = re.sub(r'#{1,6}\s+(.*)', r'\1', text)
-    
-    # Replace bold/italic
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Bold
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)      # Italic
-    text = re.sub(r'__([^_]+)__', r'\1', text)      # Bold
-    text = re.sub(r'_([^_]+)_', r'\1', text)        # Italic
-    
-    # Replace bullet points and numbered lists
-    text = re.sub(r'^\s*[-*+]\s+', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)
-    
-    # Replace links but keep text
-    text = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', text)
-    
-    # Replace horizontal rules
-    text = re.sub(r'^\s*[-*_]{3,}\s*$', '', text, flags=re.MULTILINE)
-    
-    # Replace extra newlines and spaces
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r'\s{2,}', ' ', text)
-    
-    return text.strip()
-
-def generate_speech_from_text(text, voice="Laura", model="eleven_monolingual_v1"):
-    api_key = os.getenv("ELEVENLABS_API_KEY")
-    if not api_key:
-        raise RuntimeError("ELEVENLABS_API_KEY not set in environment.")
-
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice}"
-
-    headers = {
-        "xi-api-key": api_key,
-        "Content-Type": "application/json",
-        "Accept": "audio/mpeg"
-    }
+    Run a chat turn and speak its answer while it is being written.
 
-    payload = {
-        "text": text,
-        "model_id": model,
-        "voice_settings": {
-            "stability": 0.5,
-            "similarity_boost": 0.75
-        }
-    }
+    Yields ("audio", bytes) as MP3 arrives and finally ("done", outcome), where
+    outcome has "message" (the saved MessageResponse) or "error", plus
+    "speech_error" if synthesis failed. The answer is split into sentences as the
+    model streams it and they are synthesized concurrently, so audio starts after
+    the first one. `on_event`, if given, is awaited with every chat_turn event.
+    """
+    sentences = asyncio.Queue()
+    outcome = {}
 
-    response = requests.post(url, headers=headers, json=payload)
+    async def run_turn():
+        # Streaming responses outlive the request-scoped session, so the turn
+        # owns its own session.
+        db = SessionLocal()
+        normalizer = SpeechNormalizer()
+        splitter = SentenceSplitter()
+        spoken = False
+        try:
+            async for event, data in chat_turn(user_msg, db, stream_tokens=True):
+                if on_event is not None:
+                    await on_event(event, data)
+                if event == "token":
+                    for sentence in splitter.feed(normalizer.feed(data["text"])):
+                        sentences.put_nowait(sentence)
+                        spoken = True
+                elif event == "tool_start":
+                    # Text streamed ahead of tool calls isn't the answer
+                    normalizer = SpeechNormalizer()
+                    splitter.reset()
+                elif event == "message":
+                    outcome["message"] = data
+                    rest = splitter.feed(normalizer.flush()) + splitter.flush()
+                    if not spoken and not rest:
+                        # Fallback and error replies never stream as tokens
+                        rest = speech_segments(data.message)
+                    for sentence in rest:
+                        sentences.put_nowait(sentence)
+        except Exception as e:
+            logger.error(f"Error generating AI response: {e}")
+            outcome["error"] = "Failed to generate AI response"
+        finally:
+            sentences.put_nowait(None)
+            await run_blocking(db.close)
 
-    if response.status_code != 200:
-        raise RuntimeError(f"TTS failed: {response.status_code} {response.text}")
+    async def spoken_sentences():
+        while (sentence := await sentences.get()) is not None:
+            yield sentence
 
-    # Instead of saving to a file, return audio data as base64
-    audio_data = response.content
-    audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-    
-    logger.info(f"[TTS] Generated audio | Size: {len(audio_data)} bytes")
-    return audio_base64
+    # Not tied to the caller: if the client goes away, the turn still finishes
+    # and is saved.
+    turn_task = asyncio.create_task(run_turn())
+    voice_turns.add(turn_task)
+    turn_task.add_done_callback(voice_turns.discard)
+    try:
+        async for chunk in tts_client.stream_segments(spoken_sentences(), settings.TTS_SENTENCE_CONCURRENCY):
+            yield "audio", chunk
+    except TTSError as e:
+        logger.error(f"Speech generation error: {e}")
+        outcome["speech_error"] = "Failed to generate speech"
+    await turn_task
+    yield "done", outcome
 
 @app.post("/voice-chat")
 async def voice_chat(
+    request: Request,
     conversation_id: UUID,
     user_id: UUID,
-    file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
-    db: Session = Depends(get_db)
 ):
-    try:
-        # Load API key
-        if not deepgram_api_key:
-            raise HTTPException(status_code=500, detail="Deepgram API key not configured")
-            
-        deepgram = Deepgram(deepgram_api_key)
+    """
+    Transcribe a recording and answer it as multipart/mixed: a JSON part with
+    the transcript, the spoken answer as one audio/mpeg part, then a JSON part
+    with the saved answer text.
 
-        # Read audio file
-        audio_data = await file.read()
-        if not audio_data:
-            raise HTTPException(status_code=400, detail="No audio data received")
-            
-        mimetype = file.content_type or "audio/webm"
+    The recording comes in as the multipart field "file". It is spooled to a
+    temporary file while it arrives and streamed from there to transcription;
+    uploads over VOICE_UPLOAD_MAX_BYTES are refused with 413. WAV recordings
+    lose their leading and trailing silence first, and ones without any
+    speech are answered "No speech detected" without transcribing them.
 
-        # Send audio to Deepgram for transcription
+    The answer is split into sentences while the model streams it, and the
+    sentences are synthesized concurrently, so audio starts after the first one.
+    """
+    try:
         try:
-            response = await deepgram.transcription.prerecorded(
-                {
-                    "buffer": audio_data,
-                    "mimetype": mimetype
-                },
-                {
-                    "punctuate": True,
-                    "language": "en"
-                }
+            upload = await receive_upload(
+                request, "file", settings.VOICE_UPLOAD_MAX_BYTES, settings.VOICE_UPLOAD_SPOOL_BYTES
             )
-        except Exception as e:
-            logger.error(f"Deepgram transcription error: {e}")
-            raise HTTPException(status_code=500, detail="Failed to transcribe audio")
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadInvalid as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        # Extract transcript safely
-        alternatives = response.get("results", {}).get("channels", [{}])[0].get("alternatives", [])
-        if not alternatives or not alternatives[0].get("transcript"):
-            raise HTTPException(status_code=400, detail="No speech detected")
+        try:
+            if not upload.size:
+                raise HTTPException(status_code=400, detail="No audio data received")
+            mimetype = upload.content_type or "audio/webm"
+            audio, size = iter_upload(upload), upload.size
+
+            # Trim silence off WAV recordings, and skip transcription if there is no speech at all
+            span = await voice_activity.analyze(upload) if settings.VAD_ENABLED else None
+            if span is not None:
+                if not span.has_speech:
+                    raise HTTPException(status_code=400, detail="No speech detected")
+                audio, size, mimetype = iter_speech(upload, span), span.size, "audio/wav"
+
+            # Stream the spooled recording to Deepgram for transcription
+            try:
+                transcript = await stt_client.transcribe(audio, mimetype, size=size)
+            except STTError as e:
+                logger.error(f"Deepgram transcription error: {e}")
+                raise HTTPException(status_code=500, detail="Failed to transcribe audio")
+        finally:
+            await upload.close()
 
-        transcript = alternatives[0]["transcript"]
+        if not transcript:
+            raise HTTPException(status_code=400, detail="No speech detected")
         # logger.info(f"Transcribed text: {transcript}")
 
-        # Create user message
+        # Create user message; the chat turn saves it along with the reply
         user_msg = MessageCreate(
             conversation_id=conversation_id,
             message=transcript,
             sender="User",
             user_id=user_id,
         )
-        
-        # Create and save user message
-        try:
-            user_message = crud.create_message(db, user_msg)
-            db.commit()
-        except Exception as e:
-            logger.error(f"Error saving user message: {e}")
-            db.rollback()
-            raise HTTPException(status_code=500, detail="Failed to save user message")
 
-        # Get AI response
-        try:
-            ai_response = await chat(user_msg, background_tasks, db)
-            
-            # Clean markdown from the response before TTS
-            clean_message = clean_markdown_for_tts(ai_response.message)
-            logger.info(f"Original message length: {len(ai_response.message)}, Cleaned length: {len(clean_message)}")
-            
-            # Generate speech with ElevenLabs - now returns base64 data
-            audio_base64 = generate_speech_from_text(clean_message, voice="FGY2WhTYpPnrIDTdsKH5")
+        async def voice_parts():
+            yield multipart_part("application/json")
+            yield json.dumps({"user_message": transcript}).encode() + b"\r\n"
 
-            return JSONResponse(content={
-                "user_message": transcript,
-                "ai_message": ai_response.message,
-                "audio_data": audio_base64,
-                "content_type": "audio/mpeg"
-            })
+            audio_started = False
+            async for kind, data in spoken_turn(user_msg):
+                if kind == "audio":
+                    if not audio_started:
+                        yield multipart_part(AUDIO_CONTENT_TYPE)
+                        audio_started = True
+                    yield data
+                    continue
+                if audio_started:
+                    yield b"\r\n"
+                yield multipart_part("application/json")
+                if "message" in data:
+                    part = {"ai_message": data["message"].message}
+                    if "speech_error" in data:
+                        part["error"] = data["speech_error"]
+                else:
+                    part = {"error": data["error"]}
+                yield json.dumps(part).encode() + b"\r\n"
+            yield multipart_end()
 
-        except Exception as e:
-            logger.error(f"Error generating AI response: {e}")
-            raise HTTPException(status_code=500, detail="Failed to generate AI response")
+        return StreamingResponse(voice_parts(), media_type=f"multipart/mixed; boundary={MULTIPART_BOUNDARY}")
 
     except HTTPException:
         raise
@@ -266,6 +355,146 @@ async def voice_chat(
         logger.error(f"Voice chat error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Audio parameters a /ws/voice client may pass through to live transcription,
+# e.g. raw PCM instead of the container formats STT detects by itself
+LIVE_AUDIO_OPTIONS = ("encoding", "sample_rate", "channels", "language")
+
+@app.websocket("/ws/voice")
+async def voice_socket(websocket: WebSocket):
+    """
+    Full-duplex voice chat on one WebSocket.
+
+    The client sends {"type": "start", "conversation_id": ..., "options": {...}}
+    and then microphone audio as binary frames, and {"type": "stop"} when done.
+    The server answers {"type": "ready"}, streams {"type": "transcript"} results
+    while the user talks, and every complete utterance starts a chat turn at
+    once: its events ("user_message", "token", "tool_start", "tool_end",
+    "message") go out as JSON and the spoken answer as binary MP3 frames between
+    "audio_start" and "audio_end". The microphone keeps streaming during a
+    turn; utterances that finish meanwhile are answered in order.
+    """
+    await websocket.accept()
+    # Transcripts and answers are sent from different tasks
+    send_lock = asyncio.Lock()
+
+    async def send_json(payload):
+        async with send_lock:
+            if websocket.client_state != WebSocketState.CONNECTED:
+                raise WebSocketDisconnect()
+            await websocket.send_text(json.dumps(payload))
+
+    async def send_bytes(data):
+        async with send_lock:
+            if websocket.client_state != WebSocketState.CONNECTED:
+                raise WebSocketDisconnect()
+            await websocket.send_bytes(data)
+
+    try:
+        start = await websocket.receive_json()
+        if not isinstance(start, dict) or start.get("type") != "start":
+            raise ValueError("first message must be start")
+        conversation_id = UUID(str(start.get("conversation_id")))
+        options = start.get("options") or {}
+        if not isinstance(options, dict):
+            raise ValueError("options must be an object")
+    except WebSocketDisconnect:
+        return
+    except (ValueError, KeyError):
+        await send_json({"type": "error", "detail": "Expected {\"type\": \"start\", \"conversation_id\": ...}"})
+        await websocket.close(code=1008)
+        return
+    options = {key: value for key, value in options.items() if key in LIVE_AUDIO_OPTIONS}
+
+    utterance_queue = asyncio.Queue()
+
+    async def forward_audio(transcriber):
+        try:
+            while True:
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                if frame.get("bytes") is not None:
+                    await transcriber.send(frame["bytes"])
+                elif frame.get("text") is not None:
+                    try:
+                        control = json.loads(frame["text"])
+                    except ValueError:
+                        continue
+                    if isinstance(control, dict) and control.get("type") == "stop":
+                        break
+        finally:
+            await transcriber.finish()
+
+    async def transcribe(transcriber):
+        async def on_interim(result):
+            if result.text:
+                await send_json({"type": "transcript", "text": result.text, "is_final": result.is_final})
+
+        try:
+            async for utterance in utterances(transcriber, on_interim):
+                utterance_queue.put_nowait(utterance)
+        finally:
+            utterance_queue.put_nowait(None)
+
+    async def answer():
+        client_gone = False
+
+        async def on_event(event, data):
+            # Runs inside the chat turn, which is only saved once it completes:
+            # a client that went away mustn't end it.
+            nonlocal client_gone
+            if client_gone:
+                return
+            try:
+                if event == "message":
+                    await send_json({"type": "message", "message": data.model_dump(mode="json")})
+                else:
+                    await send_json({"type": event, **data})
+            except Exception as e:
+                logger.info(f"Voice socket closed during a turn, finishing it unsent: {e!r}")
+                client_gone = True
+
+        while (utterance := await utterance_queue.get()) is not None:
+            await send_json({"type": "user_message", "text": utterance})
+            user_msg = MessageCreate(conversation_id=conversation_id, message=utterance, sender="User")
+            audio_started = False
+            async for kind, data in spoken_turn(user_msg, on_event):
+                if kind == "audio":
+                    if not audio_started:
+                        await send_json({"type": "audio_start", "content_type": AUDIO_CONTENT_TYPE})
+                        audio_started = True
+                    await send_bytes(data)
+                    continue
+                if audio_started:
+                    await send_json({"type": "audio_end"})
+                for key in ("error", "speech_error"):
+                    if key in data:
+                        await send_json({"type": "error", "detail": data[key]})
+
+    try:
+        async with LiveTranscriber(settings.DEEPGRAM_LIVE_URL, settings.DEEPGRAM_API_KEY, options) as transcriber:
+            await send_json({"type": "ready"})
+            tasks = [
+                asyncio.create_task(forward_audio(transcriber)),
+                asyncio.create_task(transcribe(transcriber)),
+                asyncio.create_task(answer()),
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+    except WebSocketDisconnect:
+        return
+    except STTError as e:
+        logger.error(f"Live transcription error: {e}")
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await send_json({"type": "error", "detail": "Live transcription failed"})
+            await websocket.close(code=1011)
+        return
+    if websocket.client_state == WebSocketState.CONNECTED:
+        await websocket.close()
+
 @app.post("/signup", response_model=UserResponse)
 def signup(user: UserCreate, db: Session = Depends(get_db)):
     existing = db.query(User).filter(User.email == user.email).first()
@@ -287,22 +516,91 @@ def create_conversation(conv: ConversationCreate, db: Session = Depends(get_db))
     return ConversationResponse(id=conversation.id, user_id=conversation.user_id)
 
 @app.get("/")
-def read_root(db: Session = Depends(get_db)):
-    result = db.execute(text("SELECT * FROM hotelassistant.users")).fetchall()
+async def read_root(db: AsyncSession = Depends(get_async_db)):
+    result = (await db.execute(text("SELECT * FROM hotelassistant.users"))).fetchall()
     # Convert list of Row objects to list of dictionaries
     users = [dict(row._mapping) for row in result] 
     return users
 
+def sse_event(event, data):
+    payload = data.model_dump_json() if isinstance(data, MessageResponse) else json.dumps(data)
+    return f"event: {event}\ndata: {payload}\n\n"
+
 @app.post("/chat", response_model=MessageResponse)
-async def chat(message: MessageCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    try:
-        user_message = crud.create_message(db, message)
-        vectorstore = get_vectorstore(str(message.conversation_id))
-        vectorstore.add_texts([message.message], metadatas=[{"sender": message.sender, "message_id": str(user_message.id), "timestamp": str(user_message.created_at)}])
+async def chat(message: MessageCreate, db: Session = Depends(get_db)):
+    response = None
+    async for event, data in chat_turn(message, db):
+        if event == "message":
+            response = data
+    return response
+
+# Streamed turns run as tasks of their own; the loop only keeps weak references
+stream_turns = set()
+
+@app.post("/chat/stream")
+async def chat_stream(message: MessageCreate):
+    """
+    Server-Sent Events variant of /chat.
 
-        conversation_messages = db.query(Message).filter(
-            Message.conversation_id == message.conversation_id
-        ).order_by(Message.created_at.asc()).limit(20).all()
+    Emits "tool_start"/"tool_end" while tools run, "token" events as the final
+    answer streams in, and a closing "message" event carrying the saved message.
+    """
+    events = asyncio.Queue()
+
+    async def run_turn():
+        # The request-scoped session is closed before a streaming body is sent,
+        # so the turn owns its own session.
+        db = SessionLocal()
+        try:
+            async for event, data in chat_turn(message, db, stream_tokens=True):
+                events.put_nowait((event, data))
+        except HTTPException as e:
+            events.put_nowait(("error", {"detail": e.detail}))
+        except Exception as e:
+            logger.error(f"Error generating AI response: {e}")
+            events.put_nowait(("error", {"detail": "Failed to generate AI response"}))
+        finally:
+            events.put_nowait(None)
+            await run_blocking(db.close)
+
+    async def event_source():
+        while (item := await events.get()) is not None:
+            yield sse_event(*item)
+
+    # Not tied to the client: the turn is only saved once it completes, so a
+    # disconnect mid-turn must not abandon it.
+    turn_task = asyncio.create_task(run_turn())
+    stream_turns.add(turn_task)
+    turn_task.add_done_callback(stream_turns.discard)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Fixed replies; they are spoken often enough to pre-synthesize at startup
+EMPTY_REPLY_FALLBACK = "I'm here to help you with hotel bookings. How can I assist you today?"
+LOOP_ERROR_REPLY = "I encountered a technical issue. Please try again."
+TURN_ERROR_REPLY = "I'm sorry, but I encountered a technical issue. Please try again."
+STATIC_REPLIES = [EMPTY_REPLY_FALLBACK, LOOP_ERROR_REPLY, TURN_ERROR_REPLY]
+
+async def chat_turn(message: MessageCreate, db: Session, stream_tokens: bool = False):
+    """
+    Run one agent turn and yield its progress as (event, data) pairs.
+
+    "tool_start" and "tool_end" wrap each batch of tool calls, "token" carries
+    answer text as it arrives (only when stream_tokens is set), and the last
+    event is always "message" with the saved MessageResponse.
+    """
+    # The turn is one unit of work: the user message, every tool result and the
+    # reply are written together at the end, in one INSERT on this session.
+    received_at = datetime.now(timezone.utc)
+    try:
+        conversation_messages = await run_blocking(crud.get_history, db, message.conversation_id)
+        # End the read so the connection goes back to the pool during the model
+        # round-trips; save_turn checks one out again at the end.
+        await run_blocking(db.rollback)
 
         lc_messages = []
         current_year = datetime.now().year
@@ -317,6 +615,7 @@ async def chat(message: MessageCreate, background_tasks: BackgroundTasks, db: Se
             "BOOKING PROCESS:\n"
             "1. When user requests booking, collect: guests count, check-in date, check-out date, room preference\n"
             "2. Use getRooms tool with room_type parameter to filter results (e.g., getRooms(check_in='2025-06-08', check_out='2025-06-10', room_type='Deluxe'))\n"
+            "   To find which dates or weekends are free, call getAvailabilityCalendar once for the whole range instead of calling getRooms for each date.\n"
             "3. When user wants specific room type, ALWAYS use room_type parameter in getRooms\n"
             "4. Do NOT allow more than the allowed guest limit per room type:\n"
                 "- Deluxe: max 3 guests\n"
@@ -363,7 +662,7 @@ async def chat(message: MessageCreate, background_tasks: BackgroundTasks, db: Se
 
         lc_messages.append(SystemMessage(content=system_prompt))
 
-        for msg in conversation_messages[:-1]:
+        for msg in conversation_messages:
             if msg.sender == "User":
                 lc_messages.append(HumanMessage(content=msg.message))
             elif msg.sender == "AI":
@@ -372,20 +671,6 @@ async def chat(message: MessageCreate, background_tasks: BackgroundTasks, db: Se
         lc_messages.append(HumanMessage(content=message.message))
         # print(HumanMessage(content=message.message))
 
-        tool_funcs = {
-            "getRoomTypes": make_get_room_types_tool,
-            "getRooms": make_get_available_rooms_tool,
-            "single_room_booking": make_single_room_booking_tool,
-            "get_upcoming_bookings": make_get_upcoming_bookings_tool,
-            "get_ongoing_bookings": make_get_ongoing_bookings_tool,
-            "get_past_bookings": make_get_past_bookings_tool,
-            "update_booking": make_update_booking_tool,
-            "cancel_booking": make_cancel_booking_tool
-        }
-
-        llm = ChatOpenAI(api_key=os.getenv("OPENAI_API_KEY"), temperature=0.2, model="gpt-4o-mini")
-        llm_with_tools = llm.bind_tools([f(db) for f in tool_funcs.values()])
-
         def extract_summary_from_tool_result(result, tool_name):
             try:
                 data = json.loads(result)
@@ -397,54 +682,46 @@ async def chat(message: MessageCreate, background_tasks: BackgroundTasks, db: Se
             return f"Tool {tool_name} responded: {result}"
         
 
-        max_tool_loops = 8
-        tool_loops = 0
+        tool_results = []
+        tool_finished_at = {}
+
+        async def execute_tool_call(tool_call):
+            """Run one tool call and return its ToolMessage plus an optional summary message."""
+            tool_name = tool_call["name"]
+            tool_instance = TOOLS.get(tool_name)
+            if not tool_instance:
+                return ToolMessage(content=json.dumps({"error": f"Tool {tool_name} not recognized."}), tool_call_id=tool_call["id"]), None
 
-        while tool_loops < max_tool_loops:
             try:
-                response = llm_with_tools.invoke(lc_messages)
+                args = tool_call.get("args", {})
+                if isinstance(args, str):
+                    args = json.loads(args)
+                if tool_name == "single_room_booking" and "room_id" in args:
+                    try:
+                        args["room_number"] = int(args.pop("room_id"))
+                    except Exception:
+                        pass
+            except Exception as e:
+                logger.error(f"Arg parsing error: {e}")
+                return ToolMessage(content=json.dumps({"error": "Invalid arguments"}), tool_call_id=tool_call["id"]), None
 
-                if isinstance(response, AIMessage) and response.tool_calls:
-                    lc_messages.append(response)
-                    for tool_call in response.tool_calls:
-                        tool_name = tool_call["name"]
-                        tool_func_constructor = tool_funcs.get(tool_name)
-                        if not tool_func_constructor:
-                            lc_messages.append(ToolMessage(content=json.dumps({"error": f"Tool {tool_name} not recognized."}), tool_call_id=tool_call["id"]))
-                            continue
+            try:
+                result = await run_blocking(invoke_tool, tool_instance, args)
+                tool_finished_at[tool_call["id"]] = datetime.now(timezone.utc)
+                tool_message = ToolMessage(content=result, tool_call_id=tool_call["id"])
+                summary_text = extract_summary_from_tool_result(result, tool_name)
+                if tool_name == "single_room_booking":
+                    # print("entering the email sending part")
+                    email_status = "not_sent"
+                    try:
+                        booking_data = json.loads(result)
+                        # print(booking_data)
 
-                        try:
-                            args = tool_call.get("args", {})
-                            if isinstance(args, str):
-                                args = json.loads(args)
-                            if tool_name == "single_room_booking" and "room_id" in args:
-                                try:
-                                    args["room_number"] = int(args.pop("room_id"))
-                                except Exception:
-                                    pass
-                        except Exception as e:
-                            logger.error(f"Arg parsing error: {e}")
-                            lc_messages.append(ToolMessage(content=json.dumps({"error": "Invalid arguments"}), tool_call_id=tool_call["id"]))
-                            continue
-
-                        tool_db = SessionLocal()
-                        try:
-                            tool_instance = tool_func_constructor(tool_db)
-                            result = tool_instance.invoke(args)
-                            lc_messages.append(ToolMessage(content=result, tool_call_id=tool_call["id"]))
-                            summary_text = extract_summary_from_tool_result(result, tool_name)
-                            if tool_name == "single_room_booking":
-                                # print("entering the email sending part")
-                                email_status = "not_sent"
-                                try:
-                                    booking_data = json.loads(result)
-                                    # print(booking_data)
-
-                                    confirmation = booking_data.get("booking_confirmation", {})
-                                    guest_email = confirmation.get("guest_email")
-                                    guest_name = llm.invoke(f"Generate a name for the guest with email {guest_email}, Your response should only be the name and nothing else.")
-                                    guest_name = guest_name.content.strip()
-                                    email_body = f"""
+                        confirmation = booking_data.get("booking_confirmation", {})
+                        guest_email = confirmation.get("guest_email")
+                        guest_name = await llm.ainvoke(f"Generate a name for the guest with email {guest_email}, Your response should only be the name and nothing else.")
+                        guest_name = guest_name.content.strip()
+                        email_body = f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -569,138 +846,238 @@ async def chat(message: MessageCreate, background_tasks: BackgroundTasks, db: Se
 </html>
 """
 
-                                    # Don't await email sending here to avoid blocking the API response
-                                    success = await send_booking_confirmation(
-                                        guest_email,
-                                        "Your Hotel Booking Confirmation",
-                                        email_body
-                                    )
-                                    email_status = "sent" if success else "failed"
-                                except Exception as e:
-                                    logger.error(f"Email preparation error: {e}")
-                                    email_status = "error"
-
-                                # Continue with the flow regardless of email status
-                            if tool_name == "single_room_booking":
-                                    # Add email status to the response to communicate it to the frontend
-                                    summary_text += f"\n\n[NOTE FOR AI MEMORY]: This booking is completed. Email status: {email_status}. Do not attempt to book again unless the user clearly asks for a new booking."
+                        # Don't await email sending here to avoid blocking the API response
+                        success = await send_booking_confirmation(
+                            guest_email,
+                            "Your Hotel Booking Confirmation",
+                            email_body
+                        )
+                        email_status = "sent" if success else "failed"
+                    except Exception as e:
+                        logger.error(f"Email preparation error: {e}")
+                        email_status = "error"
+
+                    # Continue with the flow regardless of email status
+                if tool_name == "single_room_booking":
+                        # Add email status to the response to communicate it to the frontend
+                        summary_text += f"\n\n[NOTE FOR AI MEMORY]: This booking is completed. Email status: {email_status}. Do not attempt to book again unless the user clearly asks for a new booking."
                                     
-                                    # Try to update the result with email status if it's valid JSON
-                                    try:
-                                        result_data = json.loads(result)
-                                        result_data["email_status"] = email_status
-                                        result = json.dumps(result_data)
-                                    except:
-                                        pass
-                            lc_messages.append(AIMessage(content=summary_text))
-                        except Exception as e:
-                            logger.error(f"Tool error: {e}")
-                            lc_messages.append(ToolMessage(content=json.dumps({"error": str(e)}), tool_call_id=tool_call["id"]))
-                        finally:
-                            tool_db.close()
-
-                    tool_loops += 1
-                    if tool_loops >= max_tool_loops:
-                        response = llm_with_tools.invoke(lc_messages)
-                        ai_message_text = response.content if isinstance(response, AIMessage) else str(response)
-                        break
+                        # Try to update the result with email status if it's valid JSON
+                        try:
+                            result_data = json.loads(result)
+                            result_data["email_status"] = email_status
+                            result = json.dumps(result_data)
+                        except:
+                            pass
+                return tool_message, AIMessage(content=summary_text)
+            except Exception as e:
+                logger.error(f"Tool error: {e}")
+                return ToolMessage(content=json.dumps({"error": str(e)}), tool_call_id=tool_call["id"]), None
+
+        max_tool_loops = 8
+        tool_loops = 0
+
+        while True:
+            try:
+                if stream_tokens:
+                    # Chunks add up to a full AIMessage, tool calls included, so the
+                    # streamed path makes the same decisions as ainvoke would.
+                    response = None
+                    async for chunk in llm_with_tools.astream(lc_messages):
+                        response = chunk if response is None else response + chunk
+                        if chunk.content:
+                            yield "token", {"text": chunk.content}
                 else:
+                    response = await llm_with_tools.ainvoke(lc_messages)
+
+                # After max_tool_loops rounds of tools the next reply is final.
+                if tool_loops >= max_tool_loops or not (isinstance(response, AIMessage) and response.tool_calls):
                     ai_message_text = response.content if isinstance(response, AIMessage) else str(response)
                     break
+
+                lc_messages.append(response)
+                for tool_call in response.tool_calls:
+                    yield "tool_start", {"id": tool_call["id"], "tool": tool_call["name"]}
+                # Consecutive read-only calls run concurrently; bookings and other
+                # mutating tools run alone, in the order the model asked for them.
+                outcomes = await run_tool_calls(response.tool_calls, execute_tool_call)
+                # OpenAI requires every ToolMessage to directly follow the AIMessage
+                # that requested it, so summaries go after the whole batch.
+                lc_messages.extend(tool_message for tool_message, _ in outcomes)
+                lc_messages.extend(summary for _, summary in outcomes if summary is not None)
+                tool_results.extend(
+                    (tool_call, tool_message)
+                    for tool_call, (tool_message, _) in zip(response.tool_calls, outcomes)
+                    if tool_call["id"] in tool_finished_at
+                )
+                for tool_call in response.tool_calls:
+                    yield "tool_end", {"id": tool_call["id"], "tool": tool_call["name"]}
+
+                tool_loops += 1
             except Exception as e:
                 logger.error(f"Conversation loop error: {e}")
-                ai_message_text = "I encountered a technical issue. Please try again."
+                ai_message_text = LOOP_ERROR_REPLY
                 break
 
-        fresh_db = SessionLocal()
-        try:
-            # logger.info(f"AI raw response: {response.content}")
-            if not ai_message_text.strip():
-                logger.warning("AI message is empty, providing default response")
-                ai_message_text = "I'm here to help you with hotel bookings. How can I assist you today?"
+        # logger.info(f"AI raw response: {response.content}")
+        if not ai_message_text.strip():
+            logger.warning("AI message is empty, providing default response")
+            ai_message_text = EMPTY_REPLY_FALLBACK
 
-            ai_message_obj = MessageCreate(
+        turn_messages = [(message, received_at)]
+        for tool_call, tool_message in tool_results:
+            turn_messages.append((MessageCreate(
                 conversation_id=message.conversation_id,
-                message=ai_message_text,
-                sender="AI",
-                toolsused=None
-            )
-            ai_message = crud.create_message(fresh_db, ai_message_obj)
-            fresh_db.commit()
-            vectorstore.add_texts([ai_message_text], metadatas=[{"sender": "AI", "message_id": str(ai_message.id), "timestamp": str(ai_message.created_at)}])
-            return MessageResponse(
-                id=ai_message.id,
-                conversation_id=ai_message.conversation_id,
-                message=ai_message.message,
-                sender=ai_message.sender,
-                toolsused=ai_message.toolsused,
-                created_at=ai_message.created_at
-            )
-        finally:
-            fresh_db.close()
+                message=tool_message.content,
+                sender="Tool",
+                toolsused=[tool_call["name"]]
+            ), tool_finished_at[tool_call["id"]]))
+        tools_used = list(dict.fromkeys(tool_call["name"] for tool_call, _ in tool_results))
+        turn_messages.append((MessageCreate(
+            conversation_id=message.conversation_id,
+            message=ai_message_text,
+            sender="AI",
+            toolsused=tools_used or None
+        ), datetime.now(timezone.utc)))
+        saved = await save_turn(db, turn_messages)
 
     except Exception as e:
         logger.error(f"Chat endpoint error: {str(e)}")
-        error_db = SessionLocal()
         try:
-            error_message = "I'm sorry, but I encountered a technical issue. Please try again."
+            await run_blocking(db.rollback)
             error_msg_obj = MessageCreate(
                 conversation_id=message.conversation_id,
-                message=error_message,
+                message=TURN_ERROR_REPLY,
                 sender="AI",
                 toolsused=None
             )
-            error_ai_message = crud.create_message(error_db, error_msg_obj)
-            error_db.commit()
-            return MessageResponse(
-                id=error_ai_message.id,
-                conversation_id=error_ai_message.conversation_id,
-                message=error_ai_message.message,
-                sender=error_ai_message.sender,
-                toolsused=error_ai_message.toolsused,
-                created_at=error_ai_message.created_at
-            )
+            saved = await save_turn(db, [(message, received_at), (error_msg_obj, datetime.now(timezone.utc))])
         except Exception as inner_e:
             logger.error(f"Failed to create error message: {str(inner_e)}")
             raise HTTPException(status_code=500, detail="An unexpected error occurred")
-        finally:
-            error_db.close()
 
-@app.get("/user/{user_id}/conversations")
-def get_user_conversations(user_id: UUID, db: Session = Depends(get_db)):
-    conversations = db.query(Conversation).filter(
-        Conversation.user_id == user_id
-    ).all()
-    
-    # Get the latest message for each conversation to show a preview
-    result = []
-    for conv in conversations:
-        latest_message = db.query(Message).filter(
-            Message.conversation_id == conv.id
-        ).order_by(Message.created_at.desc()).first()
-        
-        result.append({
-            "id": str(conv.id),
-            "user_id": str(conv.user_id),
-            "created_at": conv.created_at if hasattr(conv, 'created_at') else None,
-            "latest_message": latest_message.message if latest_message else None
-        })
-    
-    return result
+    ai_message = saved[-1]
+    yield "message", MessageResponse(
+        id=ai_message.id,
+        conversation_id=ai_message.conversation_id,
+        message=ai_message.message,
+        sender=ai_message.sender,
+        toolsused=ai_message.toolsused,
+        created_at=ai_message.created_at
+    )
 
-@app.get("/messages")
-def get_messages(conversation_id: UUID, db: Session = Depends(get_db)):
-    messages = db.query(Message).filter(
-        Message.conversation_id == conversation_id
-    ).order_by(Message.created_at.asc()).all()
-    
+async def save_turn(db: Session, turn_messages):
+    """
+    Write a turn's (MessageCreate, timestamp) pairs in one INSERT and queue the
+    user and AI messages for embedding. Timestamps are nudged forward where
+    needed so the stored order matches the order of the turn.
+    """
+    created_at = []
+    for _, stamp in turn_messages:
+        if created_at and stamp <= created_at[-1]:
+            stamp = created_at[-1] + timedelta(microseconds=1)
+        created_at.append(stamp)
+    saved = await run_blocking(crud.create_messages, db, [msg for msg, _ in turn_messages], created_at)
+    for msg in saved:
+        if msg.sender != "Tool":
+            embedding_pipeline.submit(str(msg.conversation_id), msg.message, {"sender": msg.sender, "message_id": str(msg.id), "timestamp": str(msg.created_at)})
+    return saved
+
+@app.get("/availability/calendar")
+def get_availability_calendar(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: Session = Depends(get_db)
+):
+    try:
+        return availability_calendar(db, from_date, to_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/metrics")
+def get_metrics():
+    return {
+        "vectorstore": vectorstore_manager.stats(),
+        "embedding_pipeline": embedding_pipeline.stats(),
+        "embedding_cache": embeddings.stats(),
+        "availability_index": availability_index.stats(),
+        "catalog": catalog.stats(),
+        "history_cache": history_cache.stats(),
+        "db_pool": pool_stats(),
+        "tts": tts_client.stats(),
+        "stt": stt_client.stats(),
+        "vad": voice_activity.stats(),
+    }
+
+@app.get("/user/{user_id}/conversations")
+def get_user_conversations(
+    user_id: UUID,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    rows = crud.get_conversation_previews(db, user_id, limit, offset, cached=settings.CONVERSATION_PREVIEW_CACHE)
     return [
         {
-            "id": str(msg.id),
-            "conversation_id": str(msg.conversation_id),
-            "message": msg.message,
-            "sender": msg.sender,
-            "created_at": msg.created_at
+            "id": str(row.id),
+            "user_id": str(row.user_id),
+            "latest_message": row.latest_message,
+            "latest_message_at": row.latest_message_at.isoformat() if row.latest_message_at else None,
+            "message_count": row.message_count
         }
-        for msg in messages
-    ]
\ No newline at end of file
+        for row in rows
+    ]
+
+def message_to_dict(msg):
+    return {
+        "id": str(msg.id),
+        "conversation_id": str(msg.conversation_id),
+        "message": msg.message,
+        "sender": msg.sender,
+        "created_at": msg.created_at.isoformat()
+    }
+
+@app.get("/messages")
+def get_messages(
+    conversation_id: UUID,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    before: Optional[UUID] = None,
+    after: Optional[UUID] = None,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    User and AI messages of a conversation, oldest first, paged by message id cursors.
+
+    Without `limit` the whole conversation is returned, as before paging existed.
+    With it, the latest `limit` messages, or the ones just before / after the
+    given message ids. With stream=true the matching messages are sent as NDJSON
+    straight from a server-side cursor.
+    """
+    if stream:
+        # The request session is closed before a streaming body is sent,
+        # so the stream owns its own session.
+        stream_db = SessionLocal()
+        rows = crud.iter_messages(stream_db, conversation_id, before=before, after=after, limit=limit)
+        try:
+            first = next(rows, None)
+        except ValueError as e:
+            stream_db.close()
+            raise HTTPException(status_code=400, detail=str(e))
+
+        def ndjson():
+            try:
+                if first is not None:
+                    yield json.dumps(message_to_dict(first)) + "\n"
+                    for msg in rows:
+                        yield json.dumps(message_to_dict(msg)) + "\n"
+            finally:
+                stream_db.close()
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    try:
+        messages = crud.get_messages_page(db, conversation_id, limit, before=before, after=after)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [message_to_dict(msg) for msg in messages]
\ No newline at end of file
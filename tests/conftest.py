@@ -0,0 +1,105 @@
+"""
+Database tests run against the Postgres named by TEST_POSTGRES_URL and are
+skipped without it. Use a scratch database: the hotelassistant tables are
+created at the start of the run, emptied after every test and dropped at the end.
+"""
+import os
+import sys
+import tempfile
+from decimal import Decimal
+
+import pytest
+
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+# app.db.session and app.config read these at import time. Never fall back to
+# POSTGRES_URL: the fixtures below drop tables.
+os.environ["POSTGRES_URL"] = TEST_POSTGRES_URL or "postgresql://localhost/unset"
+for key in ("SMTP_HOST", "SMTP_USER", "SMTP_PASSWORD", "OPENAI_API_KEY", "DEEPGRAM_API_KEY", "ELEVENLABS_API_KEY"):
+    os.environ.setdefault(key, "test")
+os.environ.setdefault("SMTP_PORT", "25")
+os.environ.setdefault("EMAIL_FROM", "test@example.com")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    from sqlalchemy import text
+    from app.db.session import engine, SEARCH_PATH
+    from app.models.models import Base, BookingRoom
+
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {SEARCH_PATH}"))
+        has_btree_gist = conn.execute(
+            text("SELECT EXISTS (SELECT FROM pg_available_extensions WHERE name = 'btree_gist')")
+        ).scalar()
+        if has_btree_gist:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+    if not has_btree_gist:
+        # The no-overlap constraint needs btree_gist for its uuid column; the
+        # queries under test only read booking_rooms, so go without it.
+        constraint = next(c for c in BookingRoom.__table__.constraints if c.name == "booking_rooms_no_overlap")
+        BookingRoom.__table__.constraints.discard(constraint)
+    Base.metadata.create_all(engine)
+    yield engine
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy import text
+    from app.db.session import SessionLocal
+    from app.models.models import Base
+    from app.catalog.catalog import catalog
+
+    session = SessionLocal()
+    yield session
+    session.close()
+    tables = ", ".join(table.fullname for table in Base.metadata.sorted_tables)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {tables} CASCADE"))
+    catalog.invalidate()
+
+
+@pytest.fixture
+def hotel(db):
+    """One Standard room type with rooms 101 and 102, and a guest without bookings."""
+    from app.models.models import Room, RoomType, RoomTypeEnum, User
+
+    standard = RoomType(type=RoomTypeEnum.Standard, description="Standard room", capacity=2, cost=Decimal("100"))
+    db.add(standard)
+    db.flush()
+    rooms = [Room(room_no=room_no, room_type_id=standard.id) for room_no in (101, 102)]
+    guest = User(email="guest@example.com", hashpass="x")
+    db.add_all([*rooms, guest])
+    db.commit()
+    return {"room_type": standard, "rooms": rooms, "guest": guest}
+
+
+@pytest.fixture
+def book(db):
+    """Commit an active booking of one room, as single_room_booking writes it."""
+    from app.models.models import Booking, BookingRoom, BookingStatus
+    from app.tools.tools import stay_range
+
+    def book(guest, room, check_in, check_out):
+        booking = Booking(user_id=guest.id, rooms=[room.id], check_in=check_in, check_out=check_out, status=BookingStatus.Booked)
+        db.add(booking)
+        db.flush()
+        db.add(BookingRoom(booking_id=booking.id, room_id=room.id, stay=stay_range(check_in, check_out)))
+        db.commit()
+        return booking
+    return book
+
+
+@pytest.fixture
+def index(db):
+    """The process-wide availability index, built from the test database and unbuilt afterwards."""
+    from app.availability.index import availability_index
+
+    availability_index.refresh(db)
+    yield availability_index
+    availability_index.start = None
@@ -0,0 +1,42 @@
+from datetime import date, timedelta
+
+from app.availability.index import availability_index
+from app.tools.tools import availability_calendar
+
+
+def free_standard(calendar):
+    return [night["available"]["Standard"] for night in calendar["nights"]]
+
+
+def test_calendar_from_the_database_without_the_index(db, hotel, book):
+    start = date.today() + timedelta(days=1)
+    book(hotel["guest"], hotel["rooms"][0], start + timedelta(days=1), start + timedelta(days=3))
+
+    calendar = availability_calendar(db, start, start + timedelta(days=4))
+
+    assert [night["date"] for night in calendar["nights"]] == [(start + timedelta(days=i)).isoformat() for i in range(4)]
+    assert free_standard(calendar) == [2, 1, 1, 2]
+    assert calendar["nights"][0]["available"] == {"Standard": 2, "Deluxe": 0, "Suite": 0}
+
+
+def test_calendar_past_the_index_horizon_uses_the_database(db, hotel, book, index):
+    start = index.start + timedelta(days=index.horizon_days - 1)
+    book(hotel["guest"], hotel["rooms"][1], start + timedelta(days=1), start + timedelta(days=2))
+
+    assert not index.covers(start, start + timedelta(days=3))
+    assert free_standard(availability_calendar(db, start, start + timedelta(days=3))) == [2, 1, 2]
+
+
+def test_calendar_from_the_index_matches_the_database(db, hotel, book):
+    start = date.today() + timedelta(days=1)
+    book(hotel["guest"], hotel["rooms"][0], start, start + timedelta(days=2))
+    book(hotel["guest"], hotel["rooms"][1], start + timedelta(days=1), start + timedelta(days=3))
+    from_database = availability_calendar(db, start, start + timedelta(days=4))
+
+    availability_index.refresh(db)
+    try:
+        assert availability_index.covers(start, start + timedelta(days=4))
+        assert availability_calendar(db, start, start + timedelta(days=4)) == from_database
+    finally:
+        availability_index.start = None
+    assert free_standard(from_database) == [1, 0, 1, 2]
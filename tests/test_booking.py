@@ -0,0 +1,65 @@
+import json
+from datetime import date, timedelta
+
+from app.models.models import BookingRoom
+from app.tools.tools import getRooms, single_room_booking
+
+
+def cancel_in_another_worker(db, booking):
+    """Free a booking's rooms in the database only, as a cancellation handled by another process would."""
+    db.query(BookingRoom).filter(BookingRoom.booking_id == booking.id).delete(synchronize_session=False)
+    db.commit()
+
+
+def test_booking_ignores_a_stale_sold_out_index(db, hotel, book, index):
+    check_in, check_out = date.today() + timedelta(days=3), date.today() + timedelta(days=5)
+    first = book(hotel["guest"], hotel["rooms"][0], check_in, check_out)
+    book(hotel["guest"], hotel["rooms"][1], check_in, check_out)
+    index.refresh(db)
+    cancel_in_another_worker(db, first)
+    assert index.free_rooms(check_in, check_out, "Standard") == []
+
+    result = json.loads(single_room_booking.invoke({
+        "db_session": db,
+        "email": "guest@example.com",
+        "room_type": "Standard",
+        "check_in": check_in.isoformat(),
+        "check_out": check_out.isoformat(),
+    }))
+
+    assert result["success"] is True
+    assert result["booking_confirmation"]["room_number"] == 101
+
+
+def test_room_counts_ignore_a_stale_sold_out_index(db, hotel, book, index):
+    check_in, check_out = date.today() + timedelta(days=3), date.today() + timedelta(days=5)
+    first = book(hotel["guest"], hotel["rooms"][0], check_in, check_out)
+    book(hotel["guest"], hotel["rooms"][1], check_in, check_out)
+    index.refresh(db)
+    cancel_in_another_worker(db, first)
+
+    result = json.loads(getRooms.invoke({
+        "db_session": db,
+        "check_in": check_in.isoformat(),
+        "check_out": check_out.isoformat(),
+        "room_type": "Standard",
+    }))
+
+    assert result["available_room_count"] == 1
+
+
+def test_booking_when_really_sold_out(db, hotel, book, index):
+    check_in, check_out = date.today() + timedelta(days=3), date.today() + timedelta(days=5)
+    for room in hotel["rooms"]:
+        book(hotel["guest"], room, check_in, check_out)
+    index.refresh(db)
+
+    result = json.loads(single_room_booking.invoke({
+        "db_session": db,
+        "email": "guest@example.com",
+        "room_type": "Standard",
+        "check_in": check_in.isoformat(),
+        "check_out": check_out.isoformat(),
+    }))
+
+    assert "No available Standard rooms" in result["error"]
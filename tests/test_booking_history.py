@@ -0,0 +1,49 @@
+import json
+from datetime import date, timedelta
+
+from app.tools.tools import get_booking_history
+
+
+def history(db, **args):
+    return json.loads(get_booking_history.invoke({"db_session": db, **args}))
+
+
+def test_lists_bookings_with_room_numbers_and_windows(db, hotel, book):
+    today = date.today()
+    guest, (room_101, room_102) = hotel["guest"], hotel["rooms"]
+    upcoming = book(guest, room_102, today + timedelta(days=10), today + timedelta(days=12))
+    past = book(guest, room_101, today - timedelta(days=10), today - timedelta(days=8))
+    ongoing = book(guest, room_101, today, today + timedelta(days=2))
+
+    result = history(db, email="guest@example.com")
+
+    assert result["total"] == 3
+    assert result["has_more"] is False
+    assert [(b["booking_id"], b["window"], b["room_number"]) for b in result["bookings"]] == [
+        (str(ongoing.id), "ongoing", 101),
+        (str(upcoming.id), "upcoming", 102),
+        (str(past.id), "past", 101),
+    ]
+    assert {b["room_type"] for b in result["bookings"]} == {"Standard"}
+
+
+def test_window_filter_and_paging(db, hotel, book):
+    today = date.today()
+    guest, (room_101, room_102) = hotel["guest"], hotel["rooms"]
+    for days in (5, 15, 25):
+        book(guest, room_102, today + timedelta(days=days), today + timedelta(days=days + 1))
+    book(guest, room_101, today - timedelta(days=3), today - timedelta(days=1))
+
+    first = history(db, email="guest@example.com", window="upcoming", limit=2)
+    second = history(db, email="guest@example.com", window="upcoming", limit=2, offset=2)
+
+    assert first["total"] == 3 and first["has_more"] is True
+    assert [b["check_in"] for b in first["bookings"] + second["bookings"]] == [
+        (today + timedelta(days=days)).isoformat() for days in (5, 15, 25)
+    ]
+    assert second["has_more"] is False
+
+
+def test_guest_without_bookings_and_unknown_email(db, hotel):
+    assert "no bookings" in history(db, email="guest@example.com")["message"]
+    assert "not found" in history(db, email="nobody@example.com")["error"]
@@ -0,0 +1,67 @@
+from sqlalchemy import insert
+
+from app.crud import crud
+from app.history.history import history_cache, HistoryEntry
+from app.models.models import Message, SenderEnum
+from app.schemas.schemas import MessageCreate
+
+
+def say(db, conversation, text, sender=SenderEnum.User):
+    return crud.create_messages(db, [MessageCreate(conversation_id=conversation.id, message=text, sender=sender)])[0]
+
+
+def write_in_another_worker(db, conversation, text):
+    """What create_messages does to the database in a process whose cache this one can't see."""
+    saved = db.scalars(insert(Message).returning(Message),
+                       [{"conversation_id": conversation.id, "message": text, "sender": SenderEnum.AI}]).one()
+    crud.update_conversation_preview(db, conversation.id, saved.message, saved.created_at)
+    db.commit()
+
+
+def texts(entries):
+    return [entry.message for entry in entries]
+
+
+def test_cached_history_follows_this_workers_writes(db, hotel):
+    conversation = crud.create_conversation(db, hotel["guest"].id)
+    say(db, conversation, "hello")
+    assert texts(crud.get_history(db, conversation.id)) == ["hello"]
+
+    say(db, conversation, "hi", SenderEnum.AI)
+    hits = history_cache.hits
+
+    assert texts(crud.get_history(db, conversation.id)) == ["hello", "hi"]
+    assert history_cache.hits == hits + 1
+
+
+def test_message_written_by_another_worker_reloads_the_history(db, hotel):
+    conversation = crud.create_conversation(db, hotel["guest"].id)
+    say(db, conversation, "hello")
+    crud.get_history(db, conversation.id)
+
+    write_in_another_worker(db, conversation, "from another worker")
+    say(db, conversation, "and again")
+
+    assert texts(crud.get_history(db, conversation.id)) == ["hello", "from another worker", "and again"]
+
+
+def test_message_committed_during_a_load_is_not_lost(db, hotel):
+    conversation = crud.create_conversation(db, hotel["guest"].id)
+    say(db, conversation, "hello")
+    # A load read the count and messages, then a turn committed before it was installed
+    count, entries = 1, [HistoryEntry(m.id, m.sender, m.message, m.created_at)
+                         for m in crud.get_recent_messages(db, conversation.id, history_cache.window)]
+    say(db, conversation, "missed by the load", SenderEnum.AI)
+    history_cache.load(conversation.id, entries, count)
+
+    assert texts(crud.get_history(db, conversation.id)) == ["hello", "missed by the load"]
+
+
+def test_append_of_a_message_the_load_already_read_is_not_duplicated(db, hotel):
+    conversation = crud.create_conversation(db, hotel["guest"].id)
+    first = say(db, conversation, "hello")
+    # The count was read before the message was committed, the messages after
+    history_cache.load(conversation.id, [HistoryEntry(first.id, first.sender, first.message, first.created_at)], 0)
+    history_cache.append(conversation.id, HistoryEntry(first.id, first.sender, first.message, first.created_at))
+
+    assert texts(crud.get_history(db, conversation.id)) == ["hello"]
@@ -0,0 +1,31 @@
+from app.crud import crud
+from app.models.models import SenderEnum
+from app.schemas.schemas import MessageCreate
+
+
+def add_messages(db, conversation, count):
+    return crud.create_messages(db, [
+        MessageCreate(conversation_id=conversation.id, message=f"message {i}",
+                      sender=SenderEnum.User if i % 2 == 0 else SenderEnum.AI)
+        for i in range(count)
+    ])
+
+
+def test_without_limit_the_whole_conversation_is_returned(db, hotel):
+    conversation = crud.create_conversation(db, hotel["guest"].id)
+    saved = add_messages(db, conversation, 60)
+
+    messages = crud.get_messages_page(db, conversation.id)
+
+    assert [m.id for m in messages] == [m.id for m in saved]
+
+
+def test_limit_pages_by_cursor(db, hotel):
+    conversation = crud.create_conversation(db, hotel["guest"].id)
+    saved = add_messages(db, conversation, 7)
+
+    latest = crud.get_messages_page(db, conversation.id, 3)
+    older = crud.get_messages_page(db, conversation.id, 3, before=latest[0].id)
+    rest = crud.get_messages_page(db, conversation.id, before=older[0].id)
+
+    assert [m.id for m in rest + older + latest] == [m.id for m in saved]
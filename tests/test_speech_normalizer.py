@@ -0,0 +1,58 @@
+import pytest
+
+from app.speech.normalizer import SpeechNormalizer, normalize_for_speech
+from benchmarks.speech_normalizer import clean_markdown_for_tts
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("## Your booking\n\n**Room 101** is *confirmed*.", "Your booking Room 101 is confirmed."),
+    ("Options:\n- Standard\n- Deluxe\n1. Suite", "Options:\nStandard\nDeluxe\nSuite"),
+    ("See [our rooms](https://example.com/rooms) or use `getRooms`.", "See our rooms or use getRooms."),
+    ("Before\n```\nSELECT 1;\n```\nafter", "Before after"),
+    ("Top\n\n---\n\nBottom", "Top Bottom"),
+    ("a * b", "a * b"),
+    ("5*3 = 15", "5*3 = 15"),
+    ("2 * 3 = 6", "2 * 3 = 6"),
+])
+def test_markdown_is_stripped_like_the_old_cleaner(text, spoken):
+    assert normalize_for_speech(text) == spoken
+    assert clean_markdown_for_tts(text) == spoken
+
+
+# Where the output deliberately differs from the removed regex cleaner, kept
+# verbatim in benchmarks/speech_normalizer.py.
+@pytest.mark.parametrize("text, old, spoken", [
+    ("Use room_type_id here", "Use roomtypeid here", "Use room_type_id here"),
+    ("foo_bar and baz_qux", "foobar and bazqux", "foo_bar and baz_qux"),
+    ("under_score_", "underscore", "under_score"),
+    ("*note", "*note", "note"),
+    ("note*", "note*", "note"),
+    ("_private", "_private", "private"),
+    ("a*b*c", "abc", "a*b*c"),
+    ("x **y", "x **y", "x y"),
+    ("Here:\n```\nunclosed code", "Here:\n```\nunclosed code", "Here:"),
+])
+def test_differences_from_the_old_cleaner(text, old, spoken):
+    assert clean_markdown_for_tts(text) == old
+    assert normalize_for_speech(text) == spoken
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("5*3 = 15", "5*3 = 15"),
+    ("x*y and 4_2", "x*y and 4_2"),
+    ("**5*3** is 15", "5*3 is 15"),
+    ("*5*3*", "5*3"),
+])
+def test_markers_between_letters_or_digits_are_kept(text, spoken):
+    assert normalize_for_speech(text) == spoken
+
+
+@pytest.mark.parametrize("text", [
+    "**Room 101** costs $100 per night; see [details](https://example.com).\n- Wi-Fi\n- room_service_menu",
+    "Start ```\nhidden\n``` end with *stray and snake_case",
+    "Multiply 5*3 or 12**2 for a*b",
+])
+def test_streamed_chunks_give_the_one_shot_result(text):
+    normalizer = SpeechNormalizer()
+    streamed = "".join(normalizer.feed(text[i:i + 3]) for i in range(0, len(text), 3)) + normalizer.flush()
+    assert streamed == normalize_for_speech(text)
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+from chromadb.api.shared_system_client import SharedSystemClient
+
+from app.vectorStore.vectorstore import VectorStoreManager
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = VectorStoreManager(max_open=1)
+    yield manager
+    manager.close_all()
+
+
+def add(manager, conversation_id):
+    manager.add_embeddings(conversation_id, ["hello"], [[0.1, 0.2, 0.3]], [{"sender": "User"}])
+
+
+def open_files(directory):
+    paths = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            paths.append(os.readlink(f"/proc/self/fd/{fd}"))
+        except OSError:
+            pass
+    return [path for path in paths if path.startswith(str(directory))]
+
+
+def test_evicted_stores_are_closed(manager, tmp_path):
+    stores = []
+    for conversation_id in ("conv-a", "conv-b", "conv-c"):
+        add(manager, conversation_id)
+        with manager.lease(conversation_id) as store:
+            stores.append(store)
+
+    evicted, live = stores[:-1], stores[-1]
+    for store in evicted:
+        assert store._client._identifier not in SharedSystemClient._identifier_to_system
+    assert SharedSystemClient._identifier_to_system[live._client._identifier] is live._client._system
+    assert open_files(tmp_path / "chroma_storage" / "conv-a") == []
+    assert open_files(tmp_path / "chroma_storage" / "conv-b") == []
+    assert manager.stats()["evictions"] == 2
+
+
+def test_reopening_a_leased_evicted_store_reuses_it(manager):
+    with manager.lease("conv-a") as first:
+        add(manager, "conv-b")  # evicts "conv-a" while it is leased
+        with manager.lease("conv-a") as again:
+            assert again is first
+    # "conv-a" is back in the cache, so its System must still be running
+    system = first._client._system
+    assert system is SharedSystemClient._identifier_to_system[first._client._identifier]
+    assert first._collection.count() == 0
+    add(manager, "conv-a")
+    assert first._collection.count() == 1
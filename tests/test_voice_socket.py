@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import uuid
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from websockets.asyncio.server import serve
+
+import main
+from app.schemas.schemas import MessageResponse
+from app.speech import fake_stt
+
+
+@pytest.fixture
+def stt_url(monkeypatch):
+    """Run app/speech/fake_stt.py on a free port and point /ws/voice at it."""
+    ready = threading.Event()
+    state = {}
+
+    async def run():
+        async with serve(fake_stt.handle, "127.0.0.1", 0) as server:
+            state["port"] = server.sockets[0].getsockname()[1]
+            state["stop"] = asyncio.get_running_loop().create_future()
+            ready.set()
+            await state["stop"]
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True)
+    thread.start()
+    ready.wait(5)
+    monkeypatch.setattr(main.settings, "DEEPGRAM_LIVE_URL", f"ws://127.0.0.1:{state['port']}/v1/listen")
+    yield
+    loop.call_soon_threadsafe(state["stop"].set_result, None)
+    thread.join(5)
+
+
+@pytest.fixture
+def turns(monkeypatch):
+    """Stand in for the model and TTS APIs: answer every utterance with an echo."""
+    heard = []
+
+    async def spoken_turn(user_msg, on_event=None):
+        heard.append(user_msg.message)
+        reply = MessageResponse(
+            id=uuid.uuid4(),
+            conversation_id=user_msg.conversation_id,
+            message=f"You said: {user_msg.message}",
+            sender="AI",
+            created_at=datetime.now(),
+        )
+        await on_event("message", reply)
+        yield "audio", reply.message.encode()
+        yield "done", {"message": reply}
+
+    monkeypatch.setattr(main, "spoken_turn", spoken_turn)
+    return heard
+
+
+def test_voice_socket_answers_a_spoken_utterance(stt_url, turns):
+    conversation_id = str(uuid.uuid4())
+    with TestClient(main.app).websocket_connect("/ws/voice") as ws:
+        ws.send_json({"type": "start", "conversation_id": conversation_id, "options": {"encoding": "linear16"}})
+        assert ws.receive_json() == {"type": "ready"}
+
+        ws.send_bytes(b"I want to book ")
+        assert ws.receive_json() == {"type": "transcript", "text": "I want to book", "is_final": False}
+        ws.send_bytes(b"a room.")
+        assert ws.receive_json() == {"type": "transcript", "text": "I want to book a room.", "is_final": True}
+
+        assert ws.receive_json() == {"type": "user_message", "text": "I want to book a room."}
+        message = ws.receive_json()
+        assert message["type"] == "message"
+        assert message["message"]["message"] == "You said: I want to book a room."
+        assert message["message"]["conversation_id"] == conversation_id
+        assert ws.receive_json() == {"type": "audio_start", "content_type": main.AUDIO_CONTENT_TYPE}
+        assert ws.receive_bytes() == b"You said: I want to book a room."
+        assert ws.receive_json() == {"type": "audio_end"}
+
+        ws.send_json({"type": "stop"})
+        with pytest.raises(WebSocketDisconnect):
+            ws.receive_json()
+    assert turns == ["I want to book a room."]
+
+
+@pytest.mark.parametrize("start", [
+    {"type": "start", "conversation_id": "not-a-uuid"},
+    {"type": "start", "conversation_id": str(uuid.uuid4()), "options": ["encoding", "linear16"]},
+    {"type": "start", "conversation_id": str(uuid.uuid4()), "options": "linear16"},
+    ["start"],
+])
+def test_voice_socket_rejects_a_bad_start_message(start):
+    with TestClient(main.app).websocket_connect("/ws/voice") as ws:
+        ws.send_json(start)
+        assert ws.receive_json() == {"type": "error", "detail": "Expected {\"type\": \"start\", \"conversation_id\": ...}"}
+        with pytest.raises(WebSocketDisconnect) as closed:
+            ws.receive_json()
+    assert closed.value.code == 1008